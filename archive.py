@@ -0,0 +1,202 @@
+"""
+Archive of closed days
+Every day older than ARCHIVE_AFTER_DAYS is packed into one gzip segment, logs/archive/<day>.gz,
+and its raw logs are removed: the logs/<day>/ course files and that day's lines of every
+logs/veh/<reg>.txt. The history queries read archived days from the segment instead.
+
+Segment layout: a sequence of gzip members, so `zcat` still prints everything.
+    member 0    JSON index {"day": ..., "entries": {name: [offset, length]}}, offsets counted
+                from the end of member 0
+    member 1..  one member per entry: "course/<course>.txt" (whole file) or
+                "veh/<reg>.txt" (that vehicle's lines of the day)
+Reading one entry decompresses only the index and that entry's member.
+
+Configuration (environment variables):
+    ARCHIVE_AFTER_DAYS  age in days at which a day is archived (default 2: today and yesterday stay raw)
+"""
+
+import gzip
+import json
+import os
+import shutil
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import logwriter
+import vehlog
+
+# =======================
+# CONFIGURATION
+# =======================
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "2"))
+LOGS_DIR = "logs"
+ARCHIVE_DIR = "logs/archive"
+INDEX_CACHE = 16  # segment indexes kept in memory
+
+# =======================
+# STATE
+# =======================
+_indexes = OrderedDict()  # day -> (entries, data start), least recently used first
+_lock = threading.Lock()
+
+
+def segment_path(day):
+    return os.path.join(ARCHIVE_DIR, f"{day}.gz")
+
+
+def has_day(day):
+    return os.path.exists(segment_path(day))
+
+
+def _read_index(path):
+    """Decompress member 0 of a segment; returns (entries, byte offset where member 1 starts)"""
+    inflater = zlib.decompressobj(wbits=31)
+    consumed = 0
+    text = b""
+    with open(path, "rb") as f:
+        while not inflater.eof:
+            chunk = f.read(8192)
+            if not chunk:
+                raise ValueError(f"truncated archive segment: {path}")
+            text += inflater.decompress(chunk)
+            consumed += len(chunk)
+    start = consumed - len(inflater.unused_data)
+    return json.loads(text)["entries"], start
+
+
+def _load(day):
+    with _lock:
+        cached = _indexes.get(day)
+        if cached is not None:
+            _indexes.move_to_end(day)
+            return cached
+    cached = _read_index(segment_path(day))
+    with _lock:
+        _indexes[day] = cached
+        while len(_indexes) > INDEX_CACHE:
+            _indexes.popitem(last=False)
+    return cached
+
+
+def index(day):
+    """Entries of an archived day: {name: [offset, length]}"""
+    return _load(day)[0]
+
+
+def read_entry(day, name):
+    """Content of one archived file (bytes), or None if the segment has no such entry"""
+    entries, start = _load(day)
+    entry = entries.get(name)
+    if entry is None:
+        return None
+    offset, length = entry
+    with open(segment_path(day), "rb") as f:
+        f.seek(start + offset)
+        return gzip.decompress(f.read(length))
+
+
+def read_vehicles(day, accept):
+    """
+    Lines of every archived vehicle log of a day whose registration passes accept(reg)
+
+    Returns:
+        dict: {reg: [line, ...]}
+    """
+    found = {}
+    for name in index(day):
+        if not name.startswith("veh/"):
+            continue
+        reg = name[4:-4]
+        if accept(reg):
+            found[reg] = read_entry(day, name).decode("utf-8", errors="replace").splitlines()
+    return found
+
+
+def _write_segment(day, members):
+    """Write the segment atomically; members: [(name, bytes)]"""
+    entries = {}
+    blobs = []
+    offset = 0
+    for name, content in members:
+        blob = gzip.compress(content, mtime=0)
+        entries[name] = [offset, len(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+    head = gzip.compress(json.dumps({"day": day, "entries": entries}).encode("utf-8"), mtime=0)
+
+    path = segment_path(day)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(head)
+        for blob in blobs:
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _veh_logs():
+    veh_dir = os.path.join(LOGS_DIR, "veh")
+    if not os.path.isdir(veh_dir):
+        return []
+    return [os.path.join(veh_dir, f) for f in sorted(os.listdir(veh_dir)) if f.endswith(".txt")]
+
+
+def closed_days():
+    """Days that still have raw logs and are old enough to archive, oldest first"""
+    cutoff = (datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)).strftime("%Y-%m-%d")
+    days = set()
+    for name in os.listdir(LOGS_DIR) if os.path.isdir(LOGS_DIR) else []:
+        if len(name) == 10 and name[4] == "-" and os.path.isdir(os.path.join(LOGS_DIR, name)):
+            days.add(name)
+    for path in _veh_logs():
+        days.update(vehlog.day_offsets(path))
+    return sorted(day for day in days if day <= cutoff)
+
+
+def archive_day(day):
+    """
+    Pack one closed day into its segment and remove its course logs (blocking - run on an I/O thread)
+    The day's lines stay in the vehicle logs; archive_closed_days drops them for all days at once.
+    Safe to re-run: an existing segment is kept. Returns the number of archived files.
+    """
+    course_dir = os.path.join(LOGS_DIR, day)
+    count = 0
+    if not has_day(day):
+        members = []
+        if os.path.isdir(course_dir):
+            for fname in sorted(os.listdir(course_dir)):
+                if fname.endswith(".txt"):
+                    with open(os.path.join(course_dir, fname), "rb") as f:
+                        members.append((f"course/{fname}", f.read()))
+        for path in _veh_logs():
+            lines = vehlog.read_day(path, day)
+            if lines:
+                text = "\n".join(lines) + "\n"
+                members.append((f"veh/{os.path.basename(path)}", text.encode("utf-8")))
+        _write_segment(day, members)
+        count = len(members)
+
+    # raw logs go only once the segment is safely on disk
+    if os.path.isdir(course_dir):
+        with logwriter.paused():
+            shutil.rmtree(course_dir, ignore_errors=True)
+    return count
+
+
+def archive_closed_days():
+    """
+    Archive every closed day, then rewrite each vehicle log once without all of them
+    Returns {day: archived files}.
+    """
+    days = closed_days()
+    archived = {day: archive_day(day) for day in days}
+    if days:
+        for path in _veh_logs():
+            logged = [day for day in days if day in vehlog.day_offsets(path)]
+            if logged:
+                vehlog.drop_days(path, logged, guard=logwriter.paused)
+    return archived
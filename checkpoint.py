@@ -0,0 +1,57 @@
+"""
+Crash-safe checkpoints of the trip tracker state
+The state is written to a temporary file, fsynced and renamed over the checkpoint, so a crash
+leaves either the previous or the new checkpoint, never a partial one. On startup load()
+returns the state only if it is recent enough; after a long outage the vehicles have moved
+on and the tracker starts clean.
+
+Configuration (environment variables):
+    CHECKPOINT_INTERVAL  seconds between checkpoints (default 60)
+    CHECKPOINT_MAX_AGE   oldest checkpoint still restored, in seconds (default 600)
+"""
+
+import json
+import os
+import time
+
+# =======================
+# CONFIGURATION
+# =======================
+CHECKPOINT_DIR = "logs/checkpoint"
+CHECKPOINT_INTERVAL = int(os.getenv("CHECKPOINT_INTERVAL", "60"))
+CHECKPOINT_MAX_AGE = int(os.getenv("CHECKPOINT_MAX_AGE", "600"))
+
+
+def path_for(name):
+    return os.path.join(CHECKPOINT_DIR, f"{name}.json")
+
+
+def save(name, state):
+    """Atomically replace the checkpoint `name` with state (a JSON-serialisable dict)"""
+    path = path_for(name)
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"saved_at": time.time(), "state": state}, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load(name, max_age=CHECKPOINT_MAX_AGE):
+    """
+    The state saved under `name`, or None if there is none, it is unreadable or too old
+
+    Returns:
+        tuple: (state, age in seconds) or (None, age or None)
+    """
+    try:
+        with open(path_for(name), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        age = time.time() - saved["saved_at"]
+        state = saved["state"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None
+    if age > max_age or age < 0:
+        return None, age
+    return state, age
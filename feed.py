@@ -0,0 +1,98 @@
+"""
+Shared HTTP client for the IDSJMK vehicles.json feed
+One pooled, keep-alive aiohttp session per process, used by main.py and trip_logger.py
+Sends If-None-Match / If-Modified-Since so an unchanged feed costs no download or parse
+"""
+
+import hashlib
+import json
+import aiohttp
+
+# =======================
+# CONFIGURATION
+# =======================
+API_URL = "https://mapa.idsjmk.cz/api/vehicles.json"
+REQUEST_TIMEOUT = 10  # seconds
+POOL_LIMIT = 10  # max simultaneous connections
+KEEPALIVE_TIMEOUT = 75  # seconds an idle connection stays open
+DNS_CACHE_TTL = 300  # seconds
+
+# =======================
+# STATE
+# =======================
+_session = None
+# {url: {"etag": ..., "last_modified": ..., "data": decoded JSON}}
+_validators = {}
+# {url: hex digest of the last 200 body} - lets callers detect identical documents
+_digests = {}
+
+
+class FeedError(Exception):
+    """The feed answered with an unexpected HTTP status."""
+
+
+def get_session():
+    """Return the process-wide session, creating it on first use (must run inside the event loop)"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMIT,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=DNS_CACHE_TTL
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        )
+    return _session
+
+
+async def close_session():
+    """Close the shared session (call on shutdown)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def fetch(url=API_URL):
+    """
+    Conditional GET of a JSON document
+
+    Returns:
+        tuple: (data, changed) - changed is False when the server answered 304 Not Modified,
+               in which case data is the previously decoded document
+
+    Raises:
+        FeedError: on any status other than 200/304
+    """
+    cached = _validators.get(url)
+    headers = {}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    async with get_session().get(url, headers=headers) as response:
+        if response.status == 304 and cached:
+            return cached["data"], False
+        if response.status != 200:
+            raise FeedError(response.status)
+        text = await response.text(encoding="utf-8-sig")  # strip UTF-8 BOM
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    data = json.loads(text)
+    _digests[url] = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    # Only remember validators once the body decoded successfully
+    if etag or last_modified:
+        _validators[url] = {"etag": etag, "last_modified": last_modified, "data": data}
+    else:
+        _validators.pop(url, None)
+    return data, True
+
+
+def digest(url=API_URL):
+    """Content hash of the last successfully fetched body (None before the first fetch)"""
+    return _digests.get(url)
@@ -0,0 +1,97 @@
+"""
+Fleet registry
+fleet.json lists every vehicle type and which fleet numbers belong to it. It is compiled
+once into a dense table indexed by fleet number, so classifying a registration is one
+list lookup. Later entries in "vehicles" override earlier ones (a range can be refined
+by a more specific range below it).
+
+Every entry of "types" also gets a .dpmb<type> (live) and .dpmb<type>today (history) command:
+    name        display name in titles ("T3", "Skoda 26Tr")
+    traction    "tram" / "trolleybus" (picks villamos / trolibusz)
+    empty_name  name in the "nothing found" messages, if different ("T3-as")
+    show        extra field per vehicle: "subtype" (lead car) or "subtypes" (every car)
+    title       field title of a live vehicle: "reg" (default, the fleet number) or "consist"
+                (every car of a coupled set, "1234+1235")
+"""
+
+import json
+import os
+from collections import namedtuple
+
+# =======================
+# CONFIGURATION
+# =======================
+FLEET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fleet.json")
+MAX_NUMBER = 9999  # fleet numbers are at most four digits
+
+# type: registry key ("t3", "26tr", ...), name: display name, traction: "tram" / "trolleybus"
+Vehicle = namedtuple("Vehicle", ["type", "name", "subtype", "traction", "family", "note"])
+
+# =======================
+# STATE
+# =======================
+types = {}  # type key -> {"name", "traction", "family", ...}, in file order
+_table = []  # fleet number -> Vehicle or None
+
+
+def load(path=FLEET_FILE):
+    """(Re)compile the registry from its data file"""
+    global types, _table
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    table = [None] * (MAX_NUMBER + 1)
+    for entry in data["vehicles"]:
+        info = data["types"][entry["type"]]
+        vehicle = Vehicle(
+            type=entry["type"],
+            name=info["name"],
+            subtype=entry.get("subtype", info["name"]),
+            traction=info["traction"],
+            family=info.get("family"),
+            note=entry.get("note")
+        )
+        numbers = list(entry.get("numbers", []))
+        for first, last in entry.get("ranges", []):
+            numbers.extend(range(first, last + 1))
+        for n in numbers:
+            table[n] = vehicle
+
+    types = data["types"]
+    _table = table
+
+
+def classify(reg):
+    """Vehicle entry for a registration ("1604", 1604, ...) or None if it is not in the registry"""
+    if isinstance(reg, int):
+        n = reg
+    else:
+        reg = str(reg)
+        if not reg.isdecimal():
+            return None
+        n = int(reg)
+    if n > MAX_NUMBER:
+        return None
+    return _table[n]
+
+
+def type_of(reg):
+    vehicle = classify(reg)
+    return vehicle.type if vehicle else None
+
+
+def matcher(*type_keys):
+    """Predicate reg -> bool for the given registry types (for the log queries)"""
+    wanted = set(type_keys)
+    return lambda reg: type_of(reg) in wanted
+
+
+def family_matcher(family):
+    """Predicate reg -> bool for a vehicle family ("tatra", "skoda", ...)"""
+    def match(reg):
+        vehicle = classify(reg)
+        return vehicle is not None and vehicle.family == family
+    return match
+
+
+load()
@@ -0,0 +1,423 @@
+"""
+Incremental log sync to GitHub through the Git Data API
+Each cycle uploads only the log files that changed since the last successful sync and
+pushes them as a single commit: blobs -> one tree (on top of the branch head) -> commit -> ref.
+
+A file is a candidate when its mtime or size differs from the last synced state; its git blob
+SHA is then computed locally and it is uploaded only if that differs from the last pushed SHA
+(a touched but identical file costs no request). A blob whose SHA is already known to be in
+the repository is referenced in the tree without uploading it again. The state is saved only
+after the ref update succeeded, so a failed cycle is retried next time.
+
+Without a state file (first run, lost disk) the path -> SHA map is seeded from one recursive
+tree listing of the branch, so files that are already on GitHub are not uploaded again.
+
+Uploaded but not yet committed blobs are recorded in a journal (JOURNAL_FILE), so a cycle
+cut short by a restart resumes where it stopped instead of uploading the same files again.
+The X-RateLimit-Remaining / X-RateLimit-Reset headers of every response are tracked: when
+only RATE_LIMIT_RESERVE requests are left, the cycle stops uploading, commits what it has and
+leaves the rest for the next cycle, which is due as soon as the limit resets (see due()).
+A large backlog therefore drains at the highest rate GitHub allows.
+
+Everything runs on the event loop without blocking it: HTTP goes through aiohttp, file
+scanning and reading run in worker threads, and blob uploads are spread over a pool of
+SYNC_WORKERS concurrent requests. Failed requests (network errors, 5xx, 429) are retried
+with exponential backoff. progress and stats describe the running / last cycle.
+
+Configuration (environment variables):
+    GITHUB_TOKEN        token with contents:write on the repository
+    GITHUB_REPO         owner/repo
+    GITHUB_BRANCH       branch to push to (default main)
+    GITHUB_API_URL      API base (default https://api.github.com; point it at a local stand-in to test)
+    GITHUB_SYNC_WORKERS concurrent blob uploads (default 4)
+    GITHUB_SYNC_INTERVAL seconds between sync cycles (default 3600)
+    GITHUB_RATE_RESERVE requests left unused at the end of a rate limit window (default 10,
+                        must cover the in-flight uploads and the 5 requests of the commit)
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import aiohttp
+
+# =======================
+# CONFIGURATION
+# =======================
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")
+GITHUB_REPO = os.getenv("GITHUB_REPO", "")
+GITHUB_BRANCH = os.getenv("GITHUB_BRANCH", "main")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+SYNC_WORKERS = int(os.getenv("GITHUB_SYNC_WORKERS", "4"))
+REQUEST_TIMEOUT = 30  # seconds
+MAX_RETRIES = 4  # extra attempts per request
+RETRY_BACKOFF = 1.0  # seconds, doubled on every attempt
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+SYNC_INTERVAL = int(os.getenv("GITHUB_SYNC_INTERVAL", "3600"))
+RATE_LIMIT_RESERVE = int(os.getenv("GITHUB_RATE_RESERVE", "10"))
+MAX_RATE_WAIT = 120  # seconds; a longer rate limit wait ends the cycle instead
+JOURNAL_EVERY = 25  # uploads between journal saves
+LOGS_DIR = "logs"
+STATE_FILE = "logs/index/gitsync.json"
+STATE_VERSION = 2  # 2: git blob SHAs (older states are re-seeded from the remote tree)
+JOURNAL_FILE = "logs/index/gitsync-journal.json"
+
+# =======================
+# STATE
+# =======================
+# {path: {"mtime": ..., "size": ..., "sha": git blob SHA}} as of the last successful sync
+_synced = None
+_seeded = False  # _synced came from a state file or the remote tree
+_blobs = set()  # blob SHAs known to exist in the repository
+# {path: state entry} uploaded as a blob but not committed yet
+_journal = {}
+
+# GitHub rate limit as of the last response
+rate = {
+    "remaining": None,  # X-RateLimit-Remaining
+    "reset": None,      # X-RateLimit-Reset (epoch seconds)
+}
+
+# the running (or last) cycle
+progress = {
+    "state": "idle",  # idle / scanning / uploading / committing
+    "done": 0,        # candidate files processed
+    "total": 0,       # candidate files (mtime or size changed)
+    "pending": 0,     # candidates left for the next cycle (rate limit)
+    "started": None,  # time.time() of the cycle start
+    "finished": None,  # time.time() of the last cycle end
+}
+
+stats = {
+    "cycles": 0,          # successful cycles
+    "failed_cycles": 0,
+    "files": 0,           # files uploaded
+    "bytes": 0,           # bytes uploaded
+    "reused_blobs": 0,    # changed files whose blob was already in the repository
+    "seeded_files": 0,    # paths learned from the remote tree
+    "resumed_files": 0,   # files taken from the journal of an interrupted cycle
+    "rate_pauses": 0,     # cycles cut short by the rate limit
+    "requests": 0,        # API requests sent
+    "retries": 0,         # of which retries
+    "last_commit": None,
+    "last_duration": None,  # seconds
+    "last_error": None,
+}
+
+
+class SyncError(Exception):
+    """The GitHub API answered with an unexpected HTTP status."""
+
+
+class RateLimited(SyncError):
+    """The rate limit is used up and resets too late to wait for it within this cycle."""
+
+
+def configured():
+    return bool(GITHUB_TOKEN and GITHUB_REPO)
+
+
+def blob_sha(content):
+    """Git blob SHA-1 of a file's content (what GitHub reports for it)"""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def _load_state():
+    global _synced, _seeded
+    if _synced is None:
+        _synced = {}
+        try:
+            with open(STATE_FILE, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                _synced = state["files"]
+                _seeded = True
+        except (OSError, ValueError, KeyError):
+            pass
+        _blobs.update(entry["sha"] for entry in _synced.values())
+        try:
+            with open(JOURNAL_FILE, "r", encoding="utf-8") as f:
+                _journal.update(json.load(f)["files"])
+        except (OSError, ValueError, KeyError):
+            pass
+        _blobs.update(entry["sha"] for entry in _journal.values())
+    return _synced
+
+
+def _save_state(files):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": STATE_VERSION, "files": files}, f)
+    os.replace(tmp, STATE_FILE)
+
+
+def _save_journal(files):
+    if not files:
+        if os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+        return
+    os.makedirs(os.path.dirname(JOURNAL_FILE), exist_ok=True)
+    tmp = JOURNAL_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"files": files}, f)
+    os.replace(tmp, JOURNAL_FILE)
+
+
+def due():
+    """True if a sync cycle should start now: the interval passed, or a backlog waits and the rate limit has reset"""
+    if progress["state"] != "idle":
+        return False
+    if progress["finished"] is None:
+        return True
+    now = time.time()
+    if progress["pending"] and rate["reset"] is not None and now >= rate["reset"]:
+        return True
+    return now - progress["finished"] >= SYNC_INTERVAL
+
+
+def _track_rate(headers):
+    remaining = headers.get("X-RateLimit-Remaining")
+    reset = headers.get("X-RateLimit-Reset")
+    if remaining is not None and remaining.isdigit():
+        rate["remaining"] = int(remaining)
+    if reset is not None and reset.isdigit():
+        rate["reset"] = int(reset)
+
+
+def _rate_low():
+    """True if the requests left in this rate limit window are down to the reserve"""
+    return (rate["remaining"] is not None and rate["remaining"] <= RATE_LIMIT_RESERVE
+            and rate["reset"] is not None and rate["reset"] > time.time())
+
+
+def _rate_limit_wait(response):
+    """Seconds to wait before retrying a rate limited (403/429) response, or None if it is not one"""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None and retry_after.isdigit():
+        return int(retry_after)
+    if rate["remaining"] == 0 and rate["reset"] is not None:
+        return max(rate["reset"] - time.time(), 0) + 1
+    return None
+
+
+def list_log_files(logs_dir=LOGS_DIR):
+    """Every .txt log and .gz archive segment under logs/ (placeholders excluded)"""
+    found = []
+    for root, dirs, files in os.walk(logs_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith((".txt", ".gz")) and "placeholder" not in path.lower():
+                found.append(path)
+    return sorted(found)
+
+
+def candidate_files():
+    """Files whose mtime or size differs from the last successful sync"""
+    synced = _load_state()
+    found = []
+    paths = list_log_files()
+    # files removed locally (archived days) stay on GitHub; forget them here
+    for path in set(synced) - set(paths):
+        del synced[path]
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        old = synced.get(path)
+        if not (old and old["mtime"] == st.st_mtime and old["size"] == st.st_size):
+            found.append(path)
+    return found
+
+
+def read_file(path):
+    """Content and state entry of a file (stat before reading: a line appended meanwhile shows up next cycle)"""
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    return content, {"mtime": st.st_mtime, "size": st.st_size, "sha": blob_sha(content)}
+
+
+async def _api(session, method, path, payload=None):
+    """
+    One API request, retried with exponential backoff on network errors, 5xx and 429
+    A rate limited request waits for the reset if that is at most MAX_RATE_WAIT away,
+    otherwise RateLimited is raised.
+    """
+    url = f"{GITHUB_API_URL}/repos/{GITHUB_REPO}/{path}"
+    for attempt in range(MAX_RETRIES + 1):
+        stats["requests"] += 1
+        if attempt:
+            stats["retries"] += 1
+        try:
+            async with session.request(method, url, json=payload) as response:
+                _track_rate(response.headers)
+                if response.status in (200, 201):
+                    return await response.json()
+                if response.status in (403, 429):
+                    wait = _rate_limit_wait(response)
+                    if wait is not None:
+                        if wait > MAX_RATE_WAIT or attempt == MAX_RETRIES:
+                            raise RateLimited(f"{method} {path}: rate limit exceeded, resets in {int(wait)} s")
+                        await asyncio.sleep(wait)
+                        continue
+                if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    text = await response.text()
+                    try:
+                        message = json.loads(text).get("message", "")
+                    except ValueError:
+                        message = text[:200]
+                    raise SyncError(f"{method} {path}: HTTP {response.status} {message}")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == MAX_RETRIES:
+                raise
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+async def _seed(session):
+    """Learn the path -> blob SHA map of logs/ from the branch's recursive tree (one request per tree)"""
+    global _seeded
+    head = (await _api(session, "GET", f"git/ref/heads/{GITHUB_BRANCH}"))["object"]["sha"]
+    tree_sha = (await _api(session, "GET", f"git/commits/{head}"))["tree"]["sha"]
+    listing = await _api(session, "GET", f"git/trees/{tree_sha}?recursive=1")
+    prefix = LOGS_DIR.rstrip("/") + "/"
+    for item in listing.get("tree", []):
+        if item.get("type") == "blob" and item["path"].startswith(prefix):
+            path = os.path.join(*item["path"].split("/"))
+            # no mtime: the file is hashed once locally and skipped if it matches
+            _synced.setdefault(path, {"mtime": None, "size": None, "sha": item["sha"]})
+            _blobs.add(item["sha"])
+            stats["seeded_files"] += 1
+    _seeded = True
+
+
+async def _upload(session, semaphore, path, changed, touched):
+    """Worker: hash one candidate locally and upload it as a blob unless GitHub already has it"""
+    async with semaphore:
+        if _rate_low():
+            progress["pending"] += 1  # left for the next cycle
+            return
+
+        try:
+            journaled = _journal.get(path)
+            if journaled:
+                st = await asyncio.to_thread(os.stat, path)
+                if journaled["mtime"] == st.st_mtime and journaled["size"] == st.st_size:
+                    changed[path] = (journaled, 0)  # uploaded by an interrupted cycle
+                    stats["resumed_files"] += 1
+                    progress["done"] += 1
+                    return
+            content, entry = await asyncio.to_thread(read_file, path)
+        except FileNotFoundError:  # archived meanwhile
+            progress["done"] += 1
+            return
+        old = _synced.get(path)
+        if old and old["sha"] == entry["sha"]:
+            touched[path] = entry
+        elif entry["sha"] in _blobs:
+            changed[path] = (entry, 0)
+            stats["reused_blobs"] += 1
+        else:
+            blob = await _api(session, "POST", "git/blobs", {
+                "content": base64.b64encode(content).decode("ascii"),
+                "encoding": "base64"
+            })
+            _blobs.add(blob["sha"])
+            changed[path] = (entry, len(content))
+            _journal[path] = entry
+            if len(_journal) % JOURNAL_EVERY == 0:
+                await asyncio.to_thread(_save_journal, dict(_journal))
+        progress["done"] += 1
+
+
+async def sync(message=None):
+    """
+    One sync cycle
+
+    Returns:
+        dict: {"files": files committed, "commit": commit SHA or None if nothing changed,
+               "pending": files left for the next cycle because of the rate limit}
+    """
+    progress.update(state="scanning", done=0, total=0, pending=0, started=time.time())
+    try:
+        await asyncio.to_thread(_load_state)
+
+        changed = {}  # path -> (entry, bytes uploaded)
+        touched = {}  # path -> entry (same content, new mtime)
+        commit = None
+        headers = {
+            "Authorization": f"token {GITHUB_TOKEN}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+        async with aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(limit=SYNC_WORKERS),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        ) as session:
+            if not _seeded:
+                await _seed(session)
+            candidates = await asyncio.to_thread(candidate_files)
+            progress.update(state="uploading", total=len(candidates))
+
+            semaphore = asyncio.Semaphore(SYNC_WORKERS)
+            results = await asyncio.gather(*(
+                _upload(session, semaphore, path, changed, touched) for path in candidates
+            ), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception) and not isinstance(result, RateLimited):
+                    raise result
+            if progress["pending"] or any(isinstance(r, RateLimited) for r in results):
+                progress["pending"] = len(candidates) - progress["done"]
+                stats["rate_pauses"] += 1
+
+            if changed:
+                progress["state"] = "committing"
+                head = (await _api(session, "GET", f"git/ref/heads/{GITHUB_BRANCH}"))["object"]["sha"]
+                base_tree = (await _api(session, "GET", f"git/commits/{head}"))["tree"]["sha"]
+                tree = [
+                    {"path": path.replace("\\", "/"), "mode": "100644", "type": "blob", "sha": entry["sha"]}
+                    for path, (entry, size) in sorted(changed.items())
+                ]
+                new_tree = await _api(session, "POST", "git/trees", {"base_tree": base_tree, "tree": tree})
+                new_commit = await _api(session, "POST", "git/commits", {
+                    "message": message or f"Auto: Update logs {datetime.now().isoformat()}",
+                    "tree": new_tree["sha"],
+                    "parents": [head]
+                })
+                await _api(session, "PATCH", f"git/refs/heads/{GITHUB_BRANCH}", {"sha": new_commit["sha"]})
+                commit = new_commit["sha"]
+                _journal.clear()
+
+        _synced.update(touched)
+        for path, (entry, size) in changed.items():
+            _synced[path] = entry
+            stats["bytes"] += size
+        if changed or touched:
+            await asyncio.to_thread(_save_state, dict(_synced))
+            await asyncio.to_thread(_save_journal, dict(_journal))
+
+        stats["cycles"] += 1
+        stats["files"] += len(changed)
+        stats["last_error"] = None
+        if commit:
+            stats["last_commit"] = commit
+        return {"files": len(changed), "commit": commit, "pending": progress["pending"]}
+    except Exception as e:
+        stats["failed_cycles"] += 1
+        stats["last_error"] = str(e)
+        if isinstance(e, RateLimited):
+            progress["pending"] = max(progress["total"], 1)  # retried right after the reset
+            stats["rate_pauses"] += 1
+        if _journal:
+            await asyncio.to_thread(_save_journal, dict(_journal))
+        raise
+    finally:
+        progress["finished"] = time.time()
+        stats["last_duration"] = round(progress["finished"] - progress["started"], 1)
+        progress["state"] = "idle"
+
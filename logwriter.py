@@ -0,0 +1,135 @@
+"""
+Buffered log writer
+Log lines are queued in memory and written on flush(): lines are grouped by target file
+and each file gets a single write() call. Hot file handles stay open in a bounded LRU.
+write() may be called from the event loop while flush() runs in an I/O thread; with
+use_executor() even the write-through mode hands its flushes to that thread.
+
+Configuration (environment variables):
+    LOG_FLUSH_INTERVAL  seconds between flushes (0 = write through on every line)
+    LOG_MAX_OPEN_FILES  size of the open file handle cache
+    LOG_FSYNC           "never" (leave it to the OS), "flush" (fsync touched files on every flush)
+"""
+
+import os
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# =======================
+# CONFIGURATION
+# =======================
+FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "5"))
+MAX_OPEN_FILES = int(os.getenv("LOG_MAX_OPEN_FILES", "64"))
+FSYNC_POLICY = os.getenv("LOG_FSYNC", "never")
+
+# =======================
+# STATE
+# =======================
+_queue = deque()  # (path, text, only_if_new) in arrival order
+_handles = OrderedDict()  # path -> open file object, least recently used first
+_flush_lock = threading.Lock()  # one flush at a time
+_executor = None  # write-through flushes run here if set (see use_executor)
+
+stats = {
+    "lines": 0,    # lines written
+    "writes": 0,   # write() calls issued
+    "flushes": 0,  # non-empty flushes
+    "opens": 0,    # files opened (LRU misses)
+}
+
+
+def write(path, text, only_if_new=False):
+    """
+    Queue text to be appended to path
+    With only_if_new the text is dropped at flush time unless it would be the first content
+    of the file (used for file headers, so the existence check happens in the I/O thread)
+    """
+    _queue.append((path, text, only_if_new))
+    if FLUSH_INTERVAL <= 0:
+        if _executor is not None:
+            _executor.submit(flush)
+        else:
+            flush()
+
+
+def use_executor(executor):
+    """Run the write-through flushes (LOG_FLUSH_INTERVAL=0) on executor instead of the caller's thread"""
+    global _executor
+    _executor = executor
+
+
+def pending():
+    """Number of queued lines"""
+    return len(_queue)
+
+
+def _get_handle(path):
+    f = _handles.get(path)
+    if f is not None:
+        _handles.move_to_end(path)
+        return f
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    f = open(path, "a", encoding="utf-8")
+    stats["opens"] += 1
+    _handles[path] = f
+    while len(_handles) > MAX_OPEN_FILES:
+        _, old = _handles.popitem(last=False)
+        old.close()
+    return f
+
+
+def flush():
+    """Write every queued line, one write() per target file. Returns the number of lines written."""
+    with _flush_lock:
+        groups = {}
+        while _queue:
+            path, text, only_if_new = _queue.popleft()
+            groups.setdefault(path, []).append((text, only_if_new))
+
+        count = 0
+        for path, items in groups.items():
+            is_new = path not in _handles and not os.path.exists(path)
+            parts = []
+            for text, only_if_new in items:
+                if only_if_new and not (is_new and not parts):
+                    continue
+                parts.append(text)
+            if not parts:
+                continue
+            f = _get_handle(path)
+            f.write("".join(parts))
+            f.flush()
+            if FSYNC_POLICY == "flush":
+                os.fsync(f.fileno())
+            count += len(parts)
+            stats["writes"] += 1
+
+        if count:
+            stats["lines"] += count
+            stats["flushes"] += 1
+        return count
+
+
+def close_all():
+    """Flush the queue and close every cached handle (call on shutdown)"""
+    flush()
+    with _flush_lock:
+        while _handles:
+            _, f = _handles.popitem(last=False)
+            f.close()
+
+
+@contextmanager
+def paused():
+    """
+    Hold off flushes and close every cached handle, so log files can be rewritten or removed
+    (lines written meanwhile stay queued and go to the new files afterwards)
+    """
+    with _flush_lock:
+        while _handles:
+            _, f = _handles.popitem(last=False)
+            f.close()
+        yield
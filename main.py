@@ -1,20 +1,45 @@
 import discord
 from discord.ext import commands, tasks
-import aiohttp
 import os
 import sys
 import tempfile
 import json
 import atexit
-import requests
-import base64
-from datetime import datetime
+import asyncio
+import signal
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import archive
+import checkpoint
+import feed
+import fleet
+import gitsync
+import logwriter
+import store
+import trips
+import vehbin
+import vehlog
 
 # =======================
 # BEÁLLÍTÁSOK
 # =======================
 TOKEN = os.getenv("TOKEN") 
 API_URL = "https://mapa.idsjmk.cz/api/vehicles.json"
+IO_WORKERS = 4  # fájlműveletek szálai (az event loop sosem blokkol fájl I/O-n)
+SNAPSHOT_TTL = 45  # másodperc – ennél régebbi pillanatkép esetén újra lekérjük
+RENDER_CACHE_SIZE = 128  # ennyi kész parancsválaszt tartunk meg (LRU)
+
+# Discord üzenetkorlátok – egy válasz a lehető legkevesebb üzenetben megy ki
+MAX_MESSAGE_CHARS = 2000    # szöveges üzenet hossza
+MAX_MESSAGE_EMBEDS = 10     # embed egy üzenetben
+MAX_EMBED_TOTAL_CHARS = 6000  # az egy üzenetben lévő embedek összes karaktere
+
+# Út vége (END) észlelés – egy-két kimaradó GPS pozíció ne vágja ketté az utat
+END_GRACE_PERIOD = int(os.getenv("END_GRACE_PERIOD", "300"))  # másodperc – ennyi ideje nem látott jármű útja ér véget
+END_GRACE_POLLS = int(os.getenv("END_GRACE_POLLS", "2"))  # és legalább ennyi feldolgozott lekérésből hiányzott
 
 LOCK_FILE = "/tmp/discord_bot.lock"
 
@@ -30,207 +55,113 @@ if os.path.exists(LOCK_FILE):
 last_seen = {}
 LOG_INTERVAL = 300  # másodperc (5 perc)
 
+# Napi aktivitás index: nap → {jármű: [első észlelés, utolsó észlelés, [vonalak], [forgalmik]]}
+day_index = {}
+dirty_days = set()      # mentésre váró napok
+DAY_INDEX_DIR = "logs/index"
+DAY_INDEX_CACHE = 8     # ennyi napot tartunk memóriában
+
 # Trip tracking for START/END detection
-active_vehicles = {}  # {vehicle_id: {"course": course_id, ...}}
+active_vehicles = {}  # {vehicle_id: {"course": course_id, ..., "last_seen": timestamp, "missed": lekérések}}
 trip_history = {}   # {vehicle_id: {"start_time": timestamp, "course": course_id, ...}}
 
 def ensure_dirs():
     os.makedirs("logs", exist_ok=True)
     os.makedirs("logs/veh", exist_ok=True)
 
-def is_t6(reg):
-    """1200-1299 T6 villamosok"""
-    try:
-        n = int(reg)
-        return 1200 <= n <= 1299
-    except:
-        return False
-
-def is_t2(reg):
-    """1200-1299 T6 villamosok"""
-    try:
-        n = int(reg)
-        return 1435 <= n <= 1436
-    except:
-        return False
-
-def is_k2(reg):
-    """1200-1299 T6 villamosok"""
-    try:
-        n = int(reg)
-        return 1080 or 1123 or 1018
-    except:
-        return False
-
-def is_k3(reg):
-    """1200-1299 T6 villamosok"""
-    try:
-        n = int(reg)
-        return 1751 <= n <= 1754
-    except:
-        return False
-
-def is_t3(reg):
-    """1500–1699 T3 villamosok"""
-    try:
-        n = int(reg)
-        return n in {
-            1604, 1606, 1607, 1608, 1611, 1613, 1614, 1619,
-            1631, 1634, 1639, 1640, 1651, 1652,
-            1517, 1558, 1561, 1603,
-            1653, 1654, 1655, 1656, 1657, 1658,
-            1564, 1576, 1583, 1587, 1589, 1620, 1628, 1629,
-            1661, 1662, 1663, 1664, 1665, 1666,
-            1615,
-            1531, 1560, 1562, 1569,
-            1525
-        }
-    except ValueError:
-        return False
+# Minden fájlművelet ezen fut, hogy a Discord heartbeat ne akadjon el lassú lemezen
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="log-io")
+
+# LOG_FLUSH_INTERVAL=0 esetén is itt írunk, nem az event loopon
+logwriter.use_executor(io_executor)
+
+async def run_io(func, *args):
+    """Run a blocking filesystem function on the I/O executor and await its result"""
+    return await asyncio.get_running_loop().run_in_executor(io_executor, func, *args)
+
+# kulcs → folyamatban lévő számítás; az egyszerre érkező azonos kérések ezt várják meg
+inflight = {}
+
+async def single_flight(key, factory):
+    """
+    Run factory() once per key at a time: concurrent callers with the same key await the
+    same task instead of starting their own. A cancelled caller does not cancel the others.
+    """
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        inflight[key] = task
+        task.add_done_callback(lambda t: inflight.pop(key) if inflight.get(key) is t else None)
+    else:
+        stats["coalesced"] += 1
+    return await asyncio.shield(task)
 
-def is_kt8(reg):
-    """1700-1749 KT8 villamosok"""
-    try:
-        n = int(reg)
-        return 1700 <= n <= 1749
-    except:
-        return False
-    
-def is_9tr(reg):    
-    try:
-        n = int(reg)
-        return n in{3076, 3136}
-    except:
-        return False
-    
-def is_14tr(reg):   
-    try:
-        n = int(reg)
-        return n in{3173, 3283}
-    except:
-        return False
-    
-def is_15tr(reg):   
-    try:
-        n = int(reg)
-        return n in{3501, 3502}
-    except:
-        return False
-    
-def is_21tr(reg):   
-    try:
-        n = int(reg)
-        return n in{3030, 3063}
-    except:
-        return False
-    
-def is_22tr(reg):   
-    try:
-        n = int(reg)
-        return n in{3601}
-    except:
-        return False
-    
-def is_26tr(reg):   
-    try:
-        n = int(reg)
-        return 3301 <= n <= 3310
-    except:
-        return False
-    
-def is_27tr(reg):   
-    try:
-        n = int(reg)
-        return 3648 <= n <= 3687
-    except:
-        return False
-    
-def is_31tr(reg):   
-    try:
-        n = int(reg)
-        return 3618 <= n <= 3647
-    except:
-        return False
-    
-def is_32tr(reg):   
-    try:
-        n = int(reg)
-        return 3311 <= n <= 3345
-    except:
-        return False
-    
-def is_evo(reg):   
-    try:
-        n = int(reg)
-        return 1822 <= n <= 1862
-    except:
-        return False
-    
-def is_antira(reg):
-    try:
-        n = int(reg)
-        return 1806 <= n <= 1819
-    except:
-        return False
-    
-def is_13t(reg):
-    try:
-        n = int(reg)
-        return 1901 <= n <= 1949
-    except:
-        return False
-    
-def is_45t(reg):
-    try:
-        n = int(reg)
-        return 1760 <= n <= 1789
-    except:
-        return False
-    
-def is_lf2(reg):
-    try:
-        n = int(reg)
-        return n in {1069, 1072, 1078, 1082, 1083, 1084, 1088, 1090, 1092, 1093, 1094, 1096, 1098, 1099, 1100, 1101, 1102, 1103, 1106, 1108, 1109, 1110, 1112, 1114, 1117, 1120, 1126, 1127, 1128, 1130, 1131, 1132}
-    except:
-        return False
+# jármű → utolsó naplózott forgalmi (a logs/veh/<jármű>.txt utolsó sora)
+last_trip = {}
 
-def is_lfr(reg):
-    try:
-        n = int(reg)
-        return n in {1497, 1523, 1530, 1539, 1541, 1551, 1553, 1554, 1555, 1556, 1557, 1567, 1573, 1574, 1575, 1580, 1582, 1584, 1586, 1590, 1592, 1596, 1597, 1598, 1599, 1601, 1605, 1616, 1617, 1626, 1627, 1630}
-    except:
-        return False
+def parse_trip_id(log_line):
+    """Forgalmi szám egy 'YYYY-MM-DD HH:MM:SS - ID 01203 - Vonal 4 - Cél' sorból"""
+    if "ID " not in log_line:
+        return None
+    return log_line.split("ID ")[1].split(" ")[0]
+
+def read_last_line(path, chunk_size=256):
+    """Return the last non-empty line of a file, reading backwards from the end"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            if b"\n" in buf.rstrip(b"\r\n"):
+                break
+    tail = buf.rstrip(b"\r\n")
+    return tail[tail.rfind(b"\n") + 1:].decode("utf-8", errors="replace")
+
+def build_last_trip_index():
+    """Fill last_trip from the tail of every vehicle log (run once at startup)"""
+    veh_dir = "logs/veh"
+    for fname in os.listdir(veh_dir):
+        if not fname.endswith(".txt"):
+            continue
+        trip_id = parse_trip_id(read_last_line(os.path.join(veh_dir, fname)))
+        if trip_id is not None:
+            last_trip[fname[:-4]] = trip_id
+    print(f"Utolsó forgalmi index: {len(last_trip)} jármű")
 
 def save_trip(trip_id, line, vehicle, dest):
-    ensure_dirs()
-
+    # A fájlokat a logwriter pufferelve írja ki (és hozza létre a könyvtárakat)
     now = datetime.now()
     today = now.strftime("%Y-%m-%d")
     ts = now.strftime("%Y-%m-%d %H:%M:%S")
 
+    record_activity(today, vehicle, ts, line, trip_id)
+
     trip_dir = f"logs/{today}"
-    os.makedirs(trip_dir, exist_ok=True)
 
     # =========================
     # JÁRAT NAPLÓ (ELSŐ ÉSZLELÉS)
     # =========================
     trip_file = f"{trip_dir}/{trip_id}.txt"
-    if not os.path.exists(trip_file):
-        with open(trip_file, "w", encoding="utf-8") as f:
-            f.write(
-                f"Dátum: {today}\n"
-                f"ID: {trip_id}\n"
-                f"Vonal: {line}\n"
-                f"Cél: {dest}\n"
-                f"Jármű: {vehicle}\n"
-                f"Első észlelés: {ts}\n"
-            )
+    # csak akkor kerül ki, ha a fájl még nem létezik (az I/O szálon ellenőrizve)
+    logwriter.write(
+        trip_file,
+        f"Dátum: {today}\n"
+        f"ID: {trip_id}\n"
+        f"Vonal: {line}\n"
+        f"Cél: {dest}\n"
+        f"Jármű: {vehicle}\n"
+        f"Első észlelés: {ts}\n",
+        only_if_new=True
+    )
 
     # =========================
     # JÁRMŰ NAPLÓ (FRISSÍTÉS)
     # =========================
     veh_file = f"logs/veh/{vehicle}.txt"
-    os.makedirs("logs/veh", exist_ok=True)
 
     key = f"{vehicle}_{trip_id}"
 
@@ -247,29 +178,27 @@ def save_trip(trip_id, line, vehicle, dest):
             write_log = True
 
     # ha forgalmi váltás volt → azonnal írunk
-    if os.path.exists(veh_file):
-        with open(veh_file, "r", encoding="utf-8") as f:
-            lines = f.read().splitlines()
-            if lines and "ID " in lines[-1]:
-                last_trip = lines[-1].split("ID ")[1].split(" ")[0]
-                if last_trip != trip_id:
-                    write_log = True
+    prev_trip = last_trip.get(vehicle)
+    if prev_trip is not None and prev_trip != trip_id:
+        write_log = True
 
     if write_log:
-        with open(veh_file, "a", encoding="utf-8") as f:
-            f.write(f"{ts} - ID {trip_id} - Vonal {line} - {dest}\n")
+        logwriter.write(veh_file, f"{ts} - ID {trip_id} - Vonal {line} - {dest}\n")
+        if store.enabled():
+            store.add_sighting(ts, vehicle, trip_id, line, dest)
+        if vehbin.enabled():
+            vehbin.add(ts, vehicle, trip_id, line, dest)
         last_seen[key] = now
+        last_trip[vehicle] = trip_id
 
 
-def log_trip_event(vehicle_id, course_id, event_type, line_name, destination):
-    """Log a trip START/END event in Hungarian format"""
-    ensure_dirs()
-    now = datetime.now()
+def log_trip_event(vehicle_id, course_id, event_type, line_name, destination, now=None):
+    """Log a trip START/END event in Hungarian format (at `now`, default: the current time)"""
+    now = now or datetime.now()
     today = now.strftime("%Y-%m-%d")
     ts = now.strftime("%Y-%m-%d %H:%M:%S")
     
     trip_dir = f"logs/{today}"
-    os.makedirs(trip_dir, exist_ok=True)
     
     # Log to course-specific file
     trip_file = f"{trip_dir}/{course_id}.txt"
@@ -277,8 +206,388 @@ def log_trip_event(vehicle_id, course_id, event_type, line_name, destination):
     destination_str = f" | Cél: {destination}" if destination else ""
     log_entry = f"{ts} | {event_type:5} | Jármű: {vehicle_id} | Vonal: {line_name}{destination_str}\n"
     
-    with open(trip_file, "a", encoding="utf-8") as f:
-        f.write(log_entry)
+    logwriter.write(trip_file, log_entry)
+    if store.enabled():
+        store.add_event(ts, event_type, vehicle_id, course_id, line_name, destination)
+
+
+# =======================
+# NAPLÓ LEKÉRDEZÉSEK
+# =======================
+def scan_vehicle_day(day, accept):
+    """
+    Read one day's lines of every vehicle log whose registration passes accept(reg)
+
+    Returns:
+        dict: {reg: [(ts, line_no, trip_id, dest), ...]}
+    """
+    if store.enabled() and store.is_complete(day):
+        # SQLite tárolóból, ha a teljes nap benne van (különben a fájlokból olvasunk)
+        return {reg: records for reg, records in store.day_records(day).items() if accept(reg)}
+
+    if vehbin.enabled() and vehbin.is_complete(day):
+        # teljes bináris napi fájl: mmap + uint32 nézet, nincs szövegfeldolgozás
+        return vehbin.read_day(day, accept)
+
+    if archive.has_day(day):
+        # archivált nap: a napi gzip szegmensből
+        day_lines = archive.read_vehicles(day, accept)
+    else:
+        day_lines = {}
+        veh_dir = "logs/veh"
+        for fname in os.listdir(veh_dir):
+            if not fname.endswith(".txt"):
+                continue
+            reg = fname.replace(".txt", "")
+            if not accept(reg):
+                continue
+            # mmap + bináris keresés: csak az adott nap sorai (vehlog.iter_day)
+            day_lines[reg] = vehlog.iter_day(os.path.join(veh_dir, fname), day)
+
+    found = {}
+    for reg, lines in day_lines.items():
+        for line in lines:
+            ts = line.split(" - ")[0]
+            trip_id = line.split("ID ")[1].split(" ")[0]
+            line_no = line.split("Vonal ")[1].split(" ")[0]
+            dest = line.split(" - ")[-1].strip()
+            found.setdefault(reg, []).append((ts, line_no, trip_id, dest))
+    return found
+
+async def query_vehicle_day(day, accept):
+    """Async front-end of scan_vehicle_day: the scan runs on the I/O executor"""
+    return await run_io(scan_vehicle_day, day, accept)
+
+def vehicle_sightings(reg, days):
+    """Sightings of one vehicle over several days (oldest first), streamed one day at a time"""
+    for day in days:
+        if store.enabled() and store.is_complete(day):
+            # SQLite: (date, vehicle) index – csak ennek a járműnek a sorai
+            yield from store.vehicle_records(day, reg)
+        else:
+            yield from scan_vehicle_day(day, lambda r: r == reg).get(reg, [])
+
+def vehicle_trips(reg, days):
+    """Trips of one vehicle over several days (blocking - run it on the I/O executor)"""
+    return list(trips.reconstruct(reg, vehicle_sightings(reg, days)))
+
+def course_day_events(day, course):
+    """START/END events of one course on one day: [(ts, event, vehicle, line, dest), ...] in time order"""
+    if store.enabled() and store.is_complete(day):
+        # SQLite: (date, course) index
+        return store.course_events(day, course)
+
+    if archive.has_day(day):
+        data = archive.read_entry(day, f"course/{course}.txt")
+        text = data.decode("utf-8", errors="replace") if data else ""
+    else:
+        try:
+            with open(f"logs/{day}/{course}.txt", "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = ""
+    return [event for event in map(store.parse_event, text.splitlines()) if event]
+
+def line_day_vehicles(day, line):
+    """Vehicles seen on one line on one day"""
+    if store.enabled() and store.is_complete(day):
+        # SQLite: (date, line) index
+        return store.line_vehicles(day, line)
+    return [
+        reg for reg, records in scan_vehicle_day(day, lambda reg: True).items()
+        if any(line_no == line for _, line_no, _, _ in records)
+    ]
+
+# =======================
+# NAPI AKTIVITÁS INDEX
+# =======================
+def record_activity(day, vehicle, ts, line, trip_id):
+    """Update the day index with one sighting (called for every ingested vehicle)"""
+    vehicles = day_index.setdefault(day, {})
+    entry = vehicles.get(vehicle)
+    if entry is None:
+        vehicles[vehicle] = [ts, ts, [line], [trip_id]]
+    else:
+        entry[1] = ts
+        if line not in entry[2]:
+            entry[2].append(line)
+        if trip_id not in entry[3]:
+            entry[3].append(trip_id)
+    dirty_days.add(day)
+
+def day_index_path(day):
+    return os.path.join(DAY_INDEX_DIR, f"{day}.json")
+
+def write_file_atomic(path, text):
+    """Write to a temp file and rename it over path, so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def load_day_index(day):
+    """Read a persisted day index, or build it from the raw vehicle logs if it has none"""
+    try:
+        with open(day_index_path(day), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except ValueError:
+        print(f"Sérült napi index, újraépítés: {day}")
+
+    vehicles = {}
+    for reg, records in scan_vehicle_day(day, lambda reg: True).items():
+        records.sort()
+        entry = [records[0][0], records[-1][0], [], []]
+        for _, line_no, trip_id, _ in records:
+            if line_no not in entry[2]:
+                entry[2].append(line_no)
+            if trip_id not in entry[3]:
+                entry[3].append(trip_id)
+        vehicles[reg] = entry
+    # lezárt napot elmentünk, hogy legközelebb ne kelljen a nyers logokat olvasni
+    if vehicles and day < datetime.now().strftime("%Y-%m-%d"):
+        write_file_atomic(day_index_path(day), json.dumps(vehicles, ensure_ascii=False))
+    return vehicles
+
+async def save_day_indexes():
+    """Persist every day index changed since the last call and trim the in-memory cache"""
+    for day in sorted(dirty_days):
+        text = json.dumps(day_index[day], ensure_ascii=False)
+        await run_io(write_file_atomic, day_index_path(day), text)
+        invalidate_render(day)  # új adat érkezett erre a napra
+    dirty_days.clear()
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    for day in sorted(d for d in day_index if d != today)[:-DAY_INDEX_CACHE]:
+        del day_index[day]
+
+async def get_day_index(day):
+    if day not in day_index:
+        loaded = await single_flight(("day_index", day), lambda: run_io(load_day_index, day))
+        # a logger_loop közben létrehozhatta (mai nap) – azt nem írjuk felül
+        day_index.setdefault(day, loaded)
+    return day_index[day]
+
+async def query_day_activity(day, accept):
+    """
+    Vehicles active on a day, answered from the day index (no raw log reads)
+
+    Returns:
+        dict: {reg: [first_ts, last_ts, [lines], [courses]]}
+    """
+    vehicles = await get_day_index(day)
+    return {reg: entry for reg, entry in vehicles.items() if accept(reg)}
+
+# =======================
+# API PILLANATKÉP (CACHE)
+# =======================
+
+# A logger_loop által legutóbb letöltött vehicles.json – ebből válaszol minden élő parancs
+snapshot = {
+    "data": None,        # a dekódolt JSON
+    "version": None,     # LastUpdate mező (vagy a letöltés ideje, ha hiányzik)
+    "fetched_at": 0.0,   # time.monotonic() a letöltéskor
+    "buckets": {},       # típus → {pályaszám: jármű adatai}, lásd group_snapshot
+}
+snapshot_lock = asyncio.Lock()
+
+# Az utoljára feldolgozott feed azonosítói – változatlan feedre nem futtatjuk újra a logolást
+processed_feed = {"last_update": None, "digest": None}
+
+# Monitorozási számlálók (.dpmbstatus)
+stats = {
+    "polls": 0,          # sikeres lekérések a logger_loop-ban
+    "skipped_polls": 0,  # ebből változatlan feed miatt kihagyott feldolgozás
+    "render_hits": 0,    # cache-ből kiszolgált parancsválaszok
+    "render_misses": 0,  # újra renderelt parancsválaszok
+    "coalesced": 0,      # egy már futó azonos számításra csatlakozott kérések
+    "suppressed_flaps": 0,  # türelmi időn belül visszatért járművek (elmaradt END+START pár)
+    "inactive_ends": 0,  # türelmi idő lejárta miatt lezárt utak
+}
+
+
+async def fetch_feed():
+    """
+    Conditional GET of vehicles.json over the shared keep-alive session.
+    Returns (data, changed); changed is False on 304 Not Modified.
+    """
+    return await feed.fetch(API_URL)
+
+
+def group_snapshot(data):
+    """
+    Classify every vehicle of a feed once, in a single pass
+
+    Returns:
+        dict: {fleet type: {reg: {"consist", "line", "dest", "trip", "lat", "lon", "subtype", "subtypes"}}}
+              subtype is the lead car's, subtypes lists every car of the consist joined with " + "
+    """
+    buckets = {}
+    for v in data.get("Vehicles", []):
+        lat = v.get("Lat")
+        lon = v.get("Lng")
+        if lat is None or lon is None:
+            continue
+
+        vehicle_label = str(v.get("ID", ""))
+        info = fleet.classify(vehicle_label)
+        if info is None:
+            continue
+
+        # Szerelvény (IDB/IDC kapcsolt kocsik)
+        cars = [vehicle_label]
+        idb = v.get("IDB")
+        idc = v.get("IDC")
+        if idb:
+            cars.append(str(idb))
+            if idc:
+                cars.append(str(idc))
+        car_types = []
+        for car in cars:
+            car_info = fleet.classify(car)
+            car_types.append(car_info.subtype if car_info else "Ismeretlen")
+
+        buckets.setdefault(info.type, {})[vehicle_label] = {
+            "consist": "+".join(cars),
+            "line": v.get("LineName", "Ismeretlen"),
+            "dest": v.get("FinalStopName", "Ismeretlen"),
+            "trip": str(v.get("Course", "Unknown")),
+            "lat": lat,
+            "lon": lon,
+            "subtype": info.subtype,
+            "subtypes": " + ".join(car_types)
+        }
+    return buckets
+
+def publish_snapshot(data, changed=True):
+    """Store a fetched feed as the current snapshot (an unchanged feed only refreshes the timestamp)"""
+    if changed or snapshot["data"] is None:
+        invalidate_render(snapshot["version"])
+        snapshot["data"] = data
+        snapshot["version"] = data.get("LastUpdate") or datetime.now().isoformat()
+        snapshot["buckets"] = group_snapshot(data)
+    snapshot["fetched_at"] = time.monotonic()
+
+
+def feed_unchanged(data):
+    """
+    True if this feed was already processed (same LastUpdate or same content hash)
+    A 304 alone proves nothing: the validators are shared with get_snapshot(), so the cached
+    document may be one a live command fetched and logger_loop has not processed yet.
+    """
+    last_update = data.get("LastUpdate")
+    if last_update and last_update == processed_feed["last_update"]:
+        return True
+    digest = feed.digest(API_URL)
+    return digest is not None and digest == processed_feed["digest"]
+
+
+def snapshot_fresh():
+    return (snapshot["data"] is not None
+            and time.monotonic() - snapshot["fetched_at"] < SNAPSHOT_TTL)
+
+
+async def get_snapshot():
+    """
+    Return the current feed, fetching it only if the cached copy is older than SNAPSHOT_TTL.
+    Concurrent callers wait for the same download instead of starting their own.
+    """
+    if snapshot_fresh():
+        return snapshot["data"]
+    async with snapshot_lock:
+        if not snapshot_fresh():
+            publish_snapshot(*await fetch_feed())
+    return snapshot["data"]
+
+
+async def get_fleet_bucket(type_key):
+    """Active vehicles of one fleet type from the current snapshot: {reg: info}"""
+    await get_snapshot()
+    return snapshot["buckets"].get(type_key, {})
+
+
+# =======================
+# PARANCSVÁLASZ CACHE
+# =======================
+
+# (parancs, argumentumok, hatókör) → kész üzenetek; a hatókör az élő parancsoknál a
+# pillanatkép verziója, a napi lekérdezéseknél a nap. Lezárt nap válasza sosem változik,
+# a mai napé minden feldolgozott lekérés után (save_day_indexes) érvénytelenné válik.
+render_cache = OrderedDict()
+
+def cached_render(key):
+    """Cached payload for (command, args, scope) or None"""
+    payload = render_cache.get(key)
+    if payload is None:
+        stats["render_misses"] += 1
+        return None
+    render_cache.move_to_end(key)
+    stats["render_hits"] += 1
+    return payload
+
+def store_render(key, payload):
+    render_cache[key] = payload
+    render_cache.move_to_end(key)
+    while len(render_cache) > RENDER_CACHE_SIZE:
+        render_cache.popitem(last=False)
+    return payload
+
+async def rendered(key, build):
+    """Cached payload for key, or build it (concurrent identical requests share one build)"""
+    payload = cached_render(key)
+    if payload is None:
+        async def render():
+            return store_render(key, await build())
+        payload = await single_flight(key, render)
+    return payload
+
+def invalidate_render(scope):
+    """Drop every cached payload of one snapshot version or day"""
+    for key in [k for k in render_cache if k[2] == scope]:
+        del render_cache[key]
+
+def text_payload(text):
+    """Pack text into as few messages as possible, splitting at line boundaries"""
+    messages = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > MAX_MESSAGE_CHARS:  # egyetlen túl hosszú sor
+            if current:
+                messages.append(current)
+                current = ""
+            messages.append(line[:MAX_MESSAGE_CHARS])
+            line = line[MAX_MESSAGE_CHARS:]
+        if current and len(current) + 1 + len(line) > MAX_MESSAGE_CHARS:
+            messages.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        messages.append(current)
+    return [{"content": m} for m in messages]
+
+def embed_payload(embeds):
+    """Pack embeds into messages of at most MAX_MESSAGE_EMBEDS embeds and MAX_EMBED_TOTAL_CHARS characters"""
+    messages = []
+    batch = []
+    total = 0
+    for e in embeds:
+        size = len(e)
+        if batch and (len(batch) >= MAX_MESSAGE_EMBEDS or total + size > MAX_EMBED_TOTAL_CHARS):
+            messages.append({"embeds": batch})
+            batch, total = [], 0
+        batch.append(e)
+        total += size
+    if batch:
+        messages.append({"embeds": batch})
+    return messages
+
+async def send_payload(ctx, payload):
+    """Send a rendered payload: a list of ctx.send() keyword arguments"""
+    for message in payload:
+        await ctx.send(**message)
 
 
 # =======================
@@ -293,311 +602,377 @@ bot = commands.Bot(command_prefix=".", intents=intents)
 # =======================
 @tasks.loop(seconds=30)
 async def logger_loop():
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    print("Hiba a JSON lekéréskor:", r.status)
-                    return
-                text = await r.text(encoding="utf-8-sig")  # BOM kezelése
-                data = json.loads(text)
-        except Exception as e:
-            print("Hiba a JSON lekéréskor:", e)
-            return
+    try:
+        async with snapshot_lock:
+            data, changed = await fetch_feed()
+            publish_snapshot(data, changed)
+    except Exception as e:
+        print("Hiba a JSON lekéréskor:", e)
+        return
 
-        vehicles = data.get("Vehicles", [])
-        
-        # Build current vehicle dict for trip tracking
-        current_vehicles = {}
-        for v in vehicles:
-            vehicle_id = str(v.get("ID", "Unknown"))
-            course_id = str(v.get("Course", "Unknown"))
-            line_name = v.get("LineName", "Unknown")
-            destination = v.get("FinalStopName", "Ismeretlen")
-            
-            current_vehicles[vehicle_id] = {
-                "course": course_id,
-                "line_name": line_name,
-                "destination": destination
-            }
+    stats["polls"] += 1
+    if feed_unchanged(data):
+        stats["skipped_polls"] += 1
+        return
+
+    vehicles = data.get("Vehicles", [])
+    
+    # Build current vehicle dict for trip tracking
+    current_vehicles = {}
+    for v in vehicles:
+        vehicle_id = str(v.get("ID", "Unknown"))
+        course_id = str(v.get("Course", "Unknown"))
+        line_name = v.get("LineName", "Unknown")
+        destination = v.get("FinalStopName", "Ismeretlen")
         
-        # TRIP START/END DETECTION
-        now = datetime.now()
+        current_vehicles[vehicle_id] = {
+            "course": course_id,
+            "line_name": line_name,
+            "destination": destination
+        }
+    
+    # TRIP START/END DETECTION
+    now = datetime.now()
+    now_ts = now.timestamp()
+    
+    # Check for new vehicles or course changes
+    for vehicle_id, vehicle_info in current_vehicles.items():
+        course_id = vehicle_info["course"]
+        line_name = vehicle_info["line_name"]
+        destination = vehicle_info["destination"]
         
-        # Check for new vehicles or course changes
-        for vehicle_id, vehicle_info in current_vehicles.items():
-            course_id = vehicle_info["course"]
-            line_name = vehicle_info["line_name"]
-            destination = vehicle_info["destination"]
+        if vehicle_id not in active_vehicles:
+            # NEW TRIP START
+            log_trip_event(vehicle_id, course_id, "START", line_name, destination)
+        elif (active_vehicles[vehicle_id]["course"] != course_id or
+              active_vehicles[vehicle_id]["destination"] != destination):
+            # TRIP END + NEW START
+            old_course = active_vehicles[vehicle_id]["course"]
+            old_line = active_vehicles[vehicle_id]["line_name"]
+            old_dest = active_vehicles[vehicle_id]["destination"]
             
-            if vehicle_id not in active_vehicles:
-                # NEW TRIP START
-                log_trip_event(vehicle_id, course_id, "START", line_name, destination)
-                active_vehicles[vehicle_id] = {
-                    "course": course_id,
-                    "line_name": line_name,
-                    "destination": destination
-                }
-            elif (active_vehicles[vehicle_id]["course"] != course_id or
-                  active_vehicles[vehicle_id]["destination"] != destination):
-                # TRIP END + NEW START
-                old_course = active_vehicles[vehicle_id]["course"]
-                old_line = active_vehicles[vehicle_id]["line_name"]
-                old_dest = active_vehicles[vehicle_id]["destination"]
-                
-                log_trip_event(vehicle_id, old_course, "END", old_line, old_dest)
-                log_trip_event(vehicle_id, course_id, "START", line_name, destination)
-                
-                active_vehicles[vehicle_id] = {
-                    "course": course_id,
-                    "line_name": line_name,
-                    "destination": destination
-                }
+            log_trip_event(vehicle_id, old_course, "END", old_line, old_dest)
+            log_trip_event(vehicle_id, course_id, "START", line_name, destination)
+        else:
+            # ugyanaz az út folytatódik – ha közben kimaradt, az egy elnyelt END+START pár
+            if active_vehicles[vehicle_id].get("missed"):
+                stats["suppressed_flaps"] += 1
+            active_vehicles[vehicle_id]["last_seen"] = now_ts
+            active_vehicles[vehicle_id]["missed"] = 0
+            continue
         
-        # Check for inactive vehicles
-        vehicles_to_remove = []
-        for vehicle_id in list(active_vehicles.keys()):
-            if vehicle_id not in current_vehicles:
-                vehicles_to_remove.append(vehicle_id)
+        active_vehicles[vehicle_id] = {
+            "course": course_id,
+            "line_name": line_name,
+            "destination": destination,
+            "last_seen": now_ts,
+            "missed": 0
+        }
+    
+    # Check for inactive vehicles – END csak a türelmi idő után, az utolsó észlelés idejével
+    vehicles_to_remove = []
+    for vehicle_id, vehicle_info in active_vehicles.items():
+        if vehicle_id in current_vehicles:
+            continue
+        vehicle_info["missed"] = vehicle_info.get("missed", 0) + 1
+        last_seen_ts = vehicle_info.setdefault("last_seen", now_ts)
+        if vehicle_info["missed"] >= END_GRACE_POLLS and now_ts - last_seen_ts >= END_GRACE_PERIOD:
+            vehicles_to_remove.append(vehicle_id)
+    
+    # Remove inactive vehicles and log END
+    for vehicle_id in vehicles_to_remove:
+        vehicle_info = active_vehicles.pop(vehicle_id)
+        log_trip_event(vehicle_id, vehicle_info["course"], "END",
+                     vehicle_info["line_name"], vehicle_info["destination"],
+                     datetime.fromtimestamp(vehicle_info["last_seen"]))
+        stats["inactive_ends"] += 1
+    
+    # Original save_trip logic - including IDB/IDC (coupled cars)
+    for v in vehicles:
+        vehicle_label = str(v.get("ID", "Unknown"))
+        idb_label = str(v.get("IDB", "")) if v.get("IDB") else None
+        idc_label = str(v.get("IDC", "")) if v.get("IDC") else None
+        
+        trip_id = str(v.get("Course", "Unknown"))
+        line = v.get("LineName", "Ismeretlen")
+        dest = v.get("FinalStopName", "Ismeretlen")
+        lat = v.get("Lat")
+        lon = v.get("Lng")
+
+        if lat is None or lon is None:
+            continue
+
+        # Log main vehicle (ID)
+        save_trip(trip_id, line, vehicle_label, dest)
         
-        # Remove inactive vehicles and log END
-        for vehicle_id in vehicles_to_remove:
-            vehicle_info = active_vehicles[vehicle_id]
-            log_trip_event(vehicle_id, vehicle_info["course"], "END", 
-                         vehicle_info["line_name"], vehicle_info["destination"])
-            del active_vehicles[vehicle_id]
+        # Log IDB (second car) if it exists
+        if idb_label and idb_label != "0" and idb_label != "Unknown":
+            save_trip(trip_id, line, idb_label, dest)
         
-        # Original save_trip logic - including IDB/IDC (coupled cars)
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", "Unknown"))
-            idb_label = str(v.get("IDB", "")) if v.get("IDB") else None
-            idc_label = str(v.get("IDC", "")) if v.get("IDC") else None
-            
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
+        # Log IDC (third car) if it exists
+        if idc_label and idc_label != "0" and idc_label != "Unknown":
+            save_trip(trip_id, line, idc_label, dest)
 
-            if lat is None or lon is None:
-                continue
+    await save_day_indexes()
 
-            # Log main vehicle (ID)
-            save_trip(trip_id, line, vehicle_label, dest)
-            
-            # Log IDB (second car) if it exists
-            if idb_label and idb_label != "0" and idb_label != "Unknown":
-                save_trip(trip_id, line, idb_label, dest)
-            
-            # Log IDC (third car) if it exists
-            if idc_label and idc_label != "0" and idc_label != "Unknown":
-                save_trip(trip_id, line, idc_label, dest)
+    # SQLite: a lekérés összes sora egyetlen tranzakcióban
+    if store.enabled():
+        await run_io(store.commit_batch, store.take_batch())
+
+    processed_feed["last_update"] = data.get("LastUpdate")
+    processed_feed["digest"] = feed.digest(API_URL)
+
+    await save_checkpoint()
 
 # =======================
-# GIT SYNC - AUTO PUSH TO GITHUB VIA API
+# ÁLLAPOT MENTÉS (CHECKPOINT) – újraindításkor nincs hamis START és szívverés
+# =======================
+last_checkpoint = 0.0  # time.monotonic() az utolsó mentéskor
+tracker_restored = False  # amíg nem töltöttük vissza, az üres állapot nem írhatja felül a mentést
+
+def tracker_state():
+    """JSON copy of the trip tracker state (take it on the event loop, write it on the I/O thread)"""
+    now = datetime.now()
+    # LOG_INTERVAL-nél régebbi bejegyzés úgyis új sort írna – nem kell tovább tartani
+    for key in [k for k, t in last_seen.items() if (now - t).total_seconds() >= LOG_INTERVAL]:
+        del last_seen[key]
+    return {
+        "active_vehicles": {vid: dict(info) for vid, info in active_vehicles.items()},
+        "trip_history": {vid: dict(info) for vid, info in trip_history.items()},
+        "last_seen": {key: t.isoformat() for key, t in last_seen.items()},
+        "processed_feed": dict(processed_feed),
+    }
+
+def apply_tracker_state(state):
+    active_vehicles.update(state.get("active_vehicles", {}))
+    trip_history.update(state.get("trip_history", {}))
+    last_seen.update({key: datetime.fromisoformat(t) for key, t in state.get("last_seen", {}).items()})
+    processed_feed.update(state.get("processed_feed", {}))
+
+async def save_checkpoint(force=False):
+    """Checkpoint the tracker state every CHECKPOINT_INTERVAL seconds"""
+    global last_checkpoint
+    if not force and time.monotonic() - last_checkpoint < checkpoint.CHECKPOINT_INTERVAL:
+        return
+    last_checkpoint = time.monotonic()
+    state = tracker_state()
+    # a mentett állapot által már naplózottnak tekintett sorok legyenek lemezen
+    await run_io(logwriter.flush)
+    await run_io(checkpoint.save, "main", state)
+
+async def restore_checkpoint():
+    global tracker_restored
+    state, age = await run_io(checkpoint.load, "main")
+    tracker_restored = True
+    if state is None:
+        if age is not None:
+            print(f"[CHECKPOINT] Elavult állapot ({int(age)} mp), tiszta indulás")
+        return
+    apply_tracker_state(state)
+    print(f"[CHECKPOINT] Visszaállítva: {len(active_vehicles)} aktív jármű ({int(age)} mp-es állapot)")
+
+def final_checkpoint():
+    """Checkpoint on exit - only once the saved state was restored (a failed login must not wipe it)"""
+    if tracker_restored:
+        checkpoint.save("main", tracker_state())
+
+# =======================
+# LOG KIÍRÁS (PUFFER)
+# =======================
+@tasks.loop(seconds=max(logwriter.FLUSH_INTERVAL, 1))
+async def log_flush_loop():
+    await run_io(logwriter.flush)
+    if vehbin.enabled():
+        await run_io(vehbin.flush)
+
+# leállításkor a pufferben maradt sorokat is kiírjuk, és csak utána mentjük az állapotot
+# (az atexit fordított sorrendben futtat: close_all → vehbin.flush → checkpoint)
+atexit.register(final_checkpoint)
+atexit.register(vehbin.flush)
+atexit.register(logwriter.close_all)
+
+# Railway minden redeploynál SIGTERM-et küld – erre a bot.run nem futtatná le az atexit-et
+async def shutdown():
+    """Stop tracking, write out every buffered line and checkpoint the state, then close the bot"""
+    logger_loop.cancel()
+    await run_io(logwriter.flush)
+    if vehbin.enabled():
+        await run_io(vehbin.flush)
+    # a logok már lemezen vannak: a mentett állapot nem lehet előrébb náluk
+    await run_io(final_checkpoint)
+    await feed.close_session()
+    await bot.close()
+
+# =======================
+# ARCHIVÁLÁS – lezárt napok gzip szegmensbe (archive.py)
 # =======================
 @tasks.loop(hours=1)
+async def archive_logs():
+    """Pack every day older than ARCHIVE_AFTER_DAYS into logs/archive/<day>.gz"""
+    try:
+        archived = await run_io(archive.archive_closed_days)
+        for day, count in archived.items():
+            print(f"[ARCHIVE] ✓ {day}: {count} files archived")
+    except Exception as e:
+        print(f"[ARCHIVE] ✗ Archiving failed: {e}")
+
+# =======================
+# GIT SYNC - AUTO PUSH TO GITHUB VIA API
+# =======================
+# 5 percenként nézzük, esedékes-e egy kör: óránként, vagy rate limit miatt félbehagyott
+# kör esetén rögtön a limit visszaállása után (gitsync.due)
+@tasks.loop(minutes=5)
 async def git_sync_logs():
-    """Upload logs to GitHub using GitHub API (no git needed)"""
+    """Upload changed logs to GitHub as one commit per cycle (see gitsync.py)"""
     try:
-        github_token = os.getenv("GITHUB_TOKEN", "")
-        github_repo = os.getenv("GITHUB_REPO", "")  # Must be set as owner/repo
-        
-        print(f"[GIT_SYNC] Starting sync...")
-        print(f"[GIT_SYNC] Token set: {bool(github_token)}")
-        print(f"[GIT_SYNC] Repo var: {github_repo if github_repo else 'NOT SET'}")
-        
-        if not github_token:
-            print("[GIT_SYNC] ⚠ GITHUB_TOKEN not set - skipping sync")
+        if not gitsync.configured():
+            print("[GIT_SYNC] ⚠ GITHUB_TOKEN / GITHUB_REPO not set - sync disabled")
+            git_sync_logs.stop()
             return
-        
-        if not github_repo:
-            print("[GIT_SYNC] ⚠ GITHUB_REPO not set - skipping sync")
-            print("[GIT_SYNC] Set GITHUB_REPO=PostelUN/DPMB-bot (or your username/repo)")
-            return
-        
-        if not os.path.isdir("logs"):
-            print("[GIT_SYNC] ⚠ logs/ directory doesn't exist")
-            return  # No logs yet
-        
-        # Find all log files
-        log_files = []
-        for root, dirs, files in os.walk("logs"):
-            for file in files:
-                if file.endswith(".txt"):
-                    file_path = os.path.join(root, file)
-                    log_files.append(file_path)
-        
-        print(f"[GIT_SYNC] Found {len(log_files)} log files")
-        
-        if not log_files:
-            print("[GIT_SYNC] No .txt files to sync")
-            return  # No files to sync
-        
-        # Verify token is valid first
-        headers = {
-            "Authorization": f"token {github_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
-        user_response = requests.get("https://api.github.com/user", headers=headers, timeout=10)
-        if user_response.status_code != 200:
-            print(f"[GIT_SYNC] ✗ Invalid GitHub token: {user_response.status_code}")
+
+        if not gitsync.due():
             return
-        
-        user_login = user_response.json().get("login")
-        print(f"[GIT_SYNC] Authenticated as: {user_login}")
-        
-        synced_count = 0
-        failed_count = 0
-        
-        for file_path in log_files:
-            try:
-                # Read file content
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Skip placeholder files
-                if "placeholder" in file_path.lower():
-                    continue
-                
-                # Encode to base64
-                content_bytes = content.encode('utf-8')
-                content_b64 = base64.b64encode(content_bytes).decode('utf-8')
-                
-                # GitHub API path
-                gh_path = file_path.replace("\\", "/")  # Windows path → Unix path
-                
-                # Construct GitHub API URL
-                get_url = f"https://api.github.com/repos/{github_repo}/contents/{gh_path}"
-                
-                print(f"[GIT_SYNC] Uploading to: {get_url}")
-                
-                # Get current file SHA (if it exists)
-                get_response = requests.get(get_url, headers=headers, timeout=10)
-                
-                sha = None
-                if get_response.status_code == 200:
-                    sha = get_response.json().get("sha")
-                elif get_response.status_code != 404:
-                    print(f"[GIT_SYNC] ⚠ Check failed: {get_response.status_code}")
-                
-                # Upload/update file
-                update_data = {
-                    "message": f"Auto: Update logs {datetime.now().isoformat()}",
-                    "content": content_b64,
-                    "branch": "main"
-                }
-                
-                if sha:
-                    update_data["sha"] = sha
-                
-                response = requests.put(
-                    get_url,
-                    headers=headers,
-                    json=update_data,
-                    timeout=10
-                )
-                
-                if response.status_code in [200, 201]:
-                    synced_count += 1
-                    print(f"[GIT_SYNC] ✓ Synced: {gh_path}")
-                else:
-                    failed_count += 1
-                    error_msg = response.json().get("message", "Unknown error")
-                    print(f"[GIT_SYNC] ✗ Failed {gh_path}: {response.status_code} - {error_msg}")
-            
-            except Exception as e:
-                failed_count += 1
-                print(f"[GIT_SYNC] ✗ Error syncing {file_path}: {e}")
-        
-        print(f"[GIT_SYNC] ✓ Synced {synced_count} files, {failed_count} failed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
+
+        # a pufferelt sorok is menjenek fel
+        await run_io(logwriter.flush)
+
+        print(f"[GIT_SYNC] Starting sync to {gitsync.GITHUB_REPO}@{gitsync.GITHUB_BRANCH}...")
+        result = await gitsync.sync()
+
+        if result["commit"]:
+            print(f"[GIT_SYNC] ✓ Synced {result['files']} changed files in commit {result['commit'][:7]} at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        else:
+            print("[GIT_SYNC] No changed log files")
+        if result["pending"]:
+            reset = gitsync.rate["reset"]
+            when = datetime.fromtimestamp(reset).strftime('%H:%M:%S') if reset else "the next cycle"
+            print(f"[GIT_SYNC] ⏸ Rate limit reached - {result['pending']} files left, resuming after {when}")
+
     except Exception as e:
-        print(f"[GIT_SYNC] ✗ Fatal error: {e}")
+        print(f"[GIT_SYNC] ✗ Sync failed: {e}")
 
 # =======================
 # PARANCSOK
 # =======================
+
+def valid_day(date):
+    """A felhasználótól kapott dátum ÉÉÉÉ-HH-NN alakú-e (fájlnevekbe és indexkulcsokba kerül)"""
+    try:
+        return datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d") == date
+    except ValueError:
+        return False
                 
 @bot.command()
 async def dpmbtatra(ctx, date: str = None):
+    if date and not valid_day(date):
+        return await ctx.send(f"❌ Érvénytelen dátum: {date} (ÉÉÉÉ-HH-NN)")
     day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    tatras = {}
 
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
+    async def build():
+        # 📖 LOG OLVASÁS (I/O szálon)
+        records = await query_vehicle_day(day, fleet.family_matcher("tatra"))
+        return render_tatra(day, records)
 
-        reg = fname.replace(".txt", "")
-        if not reg.isdigit():
-            continue
+    await send_payload(ctx, await rendered(("dpmbtatra", (day,), day), build))
 
-        num = int(reg)
-
-        # 🔒 CSAK TATRA
-        subtype = None
-        if is_t2(reg):
-            subtype = "Tatra T2 *nosztalgia*"
-        elif is_t3(reg):
-            if num in [1604, 1606, 1607, 1608, 1611, 1613, 1614, 1619, 1631, 1634, 1639, 1640, 1651, 1652]:
-                subtype = "Tatra T3G"
-            elif num in [1517, 1558, 1561, 1603] or 1653 <= num <= 1658:
-                subtype = "Tatra T3R.PV"
-            elif num in [1564, 1576, 1583, 1587, 1589, 1620, 1628, 1629]:
-                subtype = "Tatra T3P"
-            elif 1661 <= num <= 1666:
-                subtype = "Tatra T3R"
-            elif num == 1615:
-                subtype = "Tatra T3R *nosztalgia*"
-            elif num == 1525:
-                subtype = "Tatra T3 *nosztalgia*"
-            elif num in [1531, 1560, 1562, 1569]:
-                subtype = "Tatra T3R.EV"
-            else:
-                subtype = "Tatra T3 (ismeretlen)"
-        elif is_t6(reg):
-            subtype = "Tatra T6A5"
-        elif is_k2(reg):
-            if num == 1018:
-                subtype = "Tatra K2R-RT"
-            elif num == 1080:
-                subtype = "Tatra K2P"
-            elif num == 1123:
-                subtype = "Tatra K2YU *nosztalgia*"
-            else:
-                subtype = None  # nem Tatra
-        elif is_k3(reg):
-            subtype = "Tatra K3R-N"
-        elif is_kt8(reg):
-            if 1729 <= num <= 1735:
-                subtype = "Tatra KT8D5N"
-            else:
-                subtype = "Tatra KT8D5R.N2"
-
-        # Ha nem Tatra, ugorjuk át
-        if subtype is None:
-            continue
+MAX_VEH_DAYS = 7  # .dpmbveh legfeljebb ennyi napra visszamenőleg
+
+@bot.command()
+async def dpmbveh(ctx, reg: str, days: int = 1):
+    """Egy jármű menetei az elmúlt napokban (pl. .dpmbveh 1604 3)"""
+    if not reg.isdecimal():
+        return await ctx.send(f"❌ Érvénytelen pályaszám: {reg}")
+    days = max(1, min(days, MAX_VEH_DAYS))
+    now = datetime.now()
+    day_list = [(now - timedelta(days=n)).strftime("%Y-%m-%d") for n in range(days - 1, -1, -1)]
+
+    async def build():
+        found = await run_io(vehicle_trips, reg, day_list)
+        return text_payload(render_vehicle_trips(reg, day_list, found))
+
+    # a mai nap a hatókör: minden feldolgozott lekérés után újraszámoljuk
+    await send_payload(ctx, await rendered(("dpmbveh", (reg, days), day_list[-1]), build))
+
+@bot.command()
+async def dpmbcourse(ctx, course: str, date: str = None):
+    """Egy forgalmi START/END eseményei egy napon (pl. .dpmbcourse 00401 2026-10-18)"""
+    if not course.isdecimal():
+        return await ctx.send(f"❌ Érvénytelen forgalmi: {course}")
+    if date and not valid_day(date):
+        return await ctx.send(f"❌ Érvénytelen dátum: {date} (ÉÉÉÉ-HH-NN)")
+    day = date or datetime.now().strftime("%Y-%m-%d")
+
+    async def build():
+        events = await run_io(course_day_events, day, course)
+        return text_payload(render_course_events(course, day, events))
 
-        # 📖 LOG OLVASÁS
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if not line.startswith(day):
-                    continue
+    await send_payload(ctx, await rendered(("dpmbcourse", (course,), day), build))
 
-                trip_id = line.split("ID ")[1].split(" ")[0]
-                line_no = line.split("Vonal ")[1].split(" ")[0]
-                dest = line.split(" - ")[-1].strip()
+@bot.command()
+async def dpmbline(ctx, line: str, date: str = None):
+    """Egy vonalon közlekedett járművek egy napon (pl. .dpmbline 4)"""
+    if not line.isalnum():
+        return await ctx.send(f"❌ Érvénytelen vonal: {line}")
+    if date and not valid_day(date):
+        return await ctx.send(f"❌ Érvénytelen dátum: {date} (ÉÉÉÉ-HH-NN)")
+    day = date or datetime.now().strftime("%Y-%m-%d")
 
-                tatras.setdefault(reg, []).append(
-                    (subtype, line_no, trip_id, dest)
-                )
+    async def build():
+        vehicles = await run_io(line_day_vehicles, day, line)
+        return text_payload(render_line_vehicles(line, day, vehicles))
+
+    await send_payload(ctx, await rendered(("dpmbline", (line,), day), build))
+
+def format_duration(seconds):
+    hours, minutes = divmod(seconds // 60, 60)
+    return f"{hours} ó {minutes} p" if hours else f"{minutes} p"
+
+def render_vehicle_trips(reg, day_list, found):
+    vehicle = fleet.classify(reg)
+    name = f"{reg} ({vehicle.subtype})" if vehicle else reg
+    period = day_list[0] if len(day_list) == 1 else f"{day_list[0]} – {day_list[-1]}"
+    if not found:
+        return f"🚫 {name} nem közlekedett ({period})."
+
+    out = [f"🚋 {name} menetei ({period})"]
+    day = None
+    for t in found:
+        if t.start[:10] != day:
+            day = t.start[:10]
+            out.append(f"📅 {day}")
+        out.append(
+            f"{t.start[11:16]} → {t.end[11:16]} ({format_duration(t.duration)}) · "
+            f"vonal {t.line} · forgalmi {t.course} · {t.dest}"
+        )
+    return "\n".join(out)
+
+def render_course_events(course, day, events):
+    if not events:
+        return f"🚫 A(z) {course} forgalmi {day} napon nem közlekedett."
+    out = [f"🚋 {course} forgalmi ({day})"]
+    for ts, event, vehicle, line, dest in events:
+        out.append(f"{ts[11:19]} {event:5} {vehicle} · vonal {line} · {dest or '-'}")
+    return "\n".join(out)
+
+def render_line_vehicles(line, day, vehicles):
+    if not vehicles:
+        return f"🚫 A(z) {line} vonalon {day} napon nem közlekedett jármű."
+    out = [f"🚋 {line} vonal járművei ({day})"]
+    for reg in sorted(vehicles, key=lambda r: (len(r), r)):
+        vehicle = fleet.classify(reg)
+        out.append(f"{reg} ({vehicle.subtype})" if vehicle else reg)
+    return "\n".join(out)
+
+def render_tatra(day, records):
+    tatras = {
+        reg: [(fleet.classify(reg).subtype, line_no, trip_id, dest) for _, line_no, trip_id, dest in recs]
+        for reg, recs in records.items()
+    }
 
     if not tatras:
-        return await ctx.send(f"🚫 {day} napon nem volt forgalomban Tatra villamos.")
+        return text_payload(f"🚫 {day} napon nem volt forgalomban Tatra villamos.")
 
-    # EMBED KÜLDÉS
+    # EMBED ÖSSZEÁLLÍTÁS
     MAX_FIELDS = 20
     embeds = []
 
@@ -632,1501 +1007,132 @@ async def dpmbtatra(ctx, date: str = None):
         field_count += 1
 
     embeds.append(embed)
-
-    for e in embeds:
-        await ctx.send(embed=e)
+    return embed_payload(embeds)
                 
-@bot.command()
-async def dpmbt3today(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_t3(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
+# =======================
+# PARANCS MOTOR – minden fleet.json típushoz .dpmb<típus> és .dpmb<típus>today
+# =======================
+MAX_FIELDS = 20  # mezők egy embedben
+TRACTION_NOUNS = {
+    "tram": ("villamos", "villamosok"),
+    "trolleybus": ("trolibusz", "trolibuszok"),
+}
+
+def render_live(type_key, active):
+    """Embeds listing the active vehicles of one fleet type"""
+    info = fleet.types[type_key]
+    singular, plural = TRACTION_NOUNS[info["traction"]]
+    title = f"🚋 Aktív {info['name']} {plural}"
+    show = info.get("show")
 
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett T3-as villamos.")
+    embeds = []
+    embed = discord.Embed(title=title, color=0xff0000)
+    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
+        if len(embed.fields) >= MAX_FIELDS:
+            embeds.append(embed)
+            embed = discord.Embed(title=f"{title} (folytatás)", color=0xff0000)
 
-    out = [f"🚋 T3 – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
+        value_text = f"Vonal: {i['line']}\nForgalmi: {i['trip']}\nCél: {i['dest']}"
+        if show:
+            value_text = f"Altípus: {i[show]}\n" + value_text
+        note = fleet.classify(reg).note
+        if note:
+            value_text += f"\n{note}"
 
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
+        field_name = i["consist"] if info.get("title") == "consist" else reg
+        embed.add_field(name=field_name, value=value_text, inline=False)
 
-@bot.command()
-async def dpmbt3(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
+    if embed.fields:
+        embeds.append(embed)
+    return embeds
+
+def render_history(type_key, day, vehicles):
+    """Text lines (first → last sighting) of one fleet type on one day"""
+    info = fleet.types[type_key]
+    out = [f"🚋 {info['name']} – forgalomban ({day})"]
+    for reg in sorted(vehicles):
+        first_ts, last_ts, lines, courses = vehicles[reg]
+        out.append(f"{reg} — {first_ts[11:16]} → {last_ts[11:16]} (vonal {lines[0]})")
+    return "\n".join(out)
+
+def empty_message(type_key, day=None):
+    info = fleet.types[type_key]
+    singular, plural = TRACTION_NOUNS[info["traction"]]
+    name = info.get("empty_name", info["name"])
+    if day:
+        return f"🚫 {day} napon nem közlekedett {name} {singular}."
+    return f"🚫 Nincs aktív {name} {singular}."
+
+def make_live_command(type_key):
+    async def live(ctx):
         try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
+            active = await get_fleet_bucket(type_key)
         except Exception as e:
             return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
 
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            idb = v.get("IDB")
-            idc = v.get("IDC")
-            consist = vehicle_label
-            if idb:
-                consist += f"+{idb}"
-                if idc:
-                    consist += f"+{idc}"
-            trip_id = str(v.get("Course", "Unknown"))  # Forgalmi
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_t3(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
+        async def build():
+            if not active:
+                return text_payload(empty_message(type_key))
+            return embed_payload(render_live(type_key, active))
 
-            # Altípus meghatározása
-            num = int(vehicle_label) if vehicle_label.isdigit() else 0
-            if num in [1604, 1606, 1607, 1608, 1611, 1613, 1614, 1619, 1631, 1634, 1639, 1640, 1651, 1652]:
-                subtype = "Tatra T3G"
-            elif num in [1517, 1558, 1561, 1603] or 1653 <= num <= 1658:
-                subtype = "Tatra T3R.PV"
-            elif num in [1564, 1576, 1583, 1587, 1589, 1620, 1628, 1629]:
-                subtype = "Tatra T3P"
-            elif num in [1661, 1662, 1663, 1664, 1665, 1666]:
-                subtype = "Tatra T3R"
-            elif num == 1615:
-                subtype = "Tatra T3R *nosztalgia*"
-            elif num in [1531, 1560, 1562, 1569]:
-                subtype = "Tatra T3R.EV"
-            elif num == 1525:
-                subtype = "Tatra T3 *nosztalgia*"
-            else:
-                subtype = "T3 (ismeretlen)"
-
-            active[vehicle_label] = {
-                "consist": consist if idb else vehicle_label,
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon,
-                "subtype": subtype
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív T3-as villamos.")
-
-    # EMBED DARABOLÁS
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív T3 villamosok", color=0xff0000)
-    field_count = 0
+        await send_payload(ctx, await rendered((f"dpmb{type_key}", (), snapshot["version"]), build))
+    return live
 
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(title="🚋 Aktív T3 villamosok (folytatás)", color=0xff0000)
-            field_count = 0
-
-        embed.add_field(
-            name=f"{i['consist']}",
-            value=f"Altípus: {i['subtype']}\nVonal: {i['line']}\nForgalmi: {i['trip']}\nCél: {i['dest']}",
-            inline=False
-        )
-        field_count += 1
-
-    embeds.append(embed)
-    for e in embeds:
-        await ctx.send(embed=e)
-
-
-@bot.command()
-async def dpmbt6today(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_t6(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
-
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett T6A5 villamos.")
-
-    out = [f"🚋 T6A5 – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
-
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
-
-@bot.command()
-async def dpmbt6(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            idb = v.get("IDB")
-            idc = v.get("IDC")
-            consist = vehicle_label
-            if idb:
-                consist += f"+{idb}"
-                if idc:
-                    consist += f"+{idc}"
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_t6(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "consist": consist if idb else vehicle_label,
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív T6A5 villamos.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív T6A5 villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív T6A5 villamosok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        value_text = (
-            f"Vonal: {i['line']}\n"
-            f"Forgalmi: {i['trip']}\n"
-            f"Cél: {i['dest']}"
-        )
-
-        try:
-            reg_num = int(reg)
-            if 1221 <= reg_num <= 1248:
-                value_text += "\n*🛠️ Tervezett kivonás: 2026. tavasz*"
-        except ValueError:
-            pass
-
-        embed.add_field(
-            name=f"{i['consist']}",
-            value=value_text,
-            inline=False
-        )
-        field_count += 1
-
-    # Csak akkor adjuk hozzá az utolsó embedet, ha nem üres
-    if embed.fields:
-        embeds.append(embed)
-
-    # KÜLDÉS ASZINKRON FÜGGVÉNYEN BELÜL
-    for e in embeds:
-        await ctx.send(embed=e)
-
-@bot.command()
-async def dpmbk3today(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_k3(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
-
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett K3R-N villamos.")
-
-    out = [f"🚋 K3R-N – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
-
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
-
-@bot.command()
-async def dpmbk3(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")  # BOM kezelése
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))     # Forgalmi
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            # Csak T3-asok
-            if not is_k3(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,    # hozzáadva a forgalmi
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív K3R-N villamos.")
-
-    # EMBED DARABOLÁS
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív K3R-N villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(title="🚋 Aktív K3R-N villamosok (folytatás)", color=0xff0000)
-            field_count = 0
-
-        embed.add_field(
-            name=f"{reg}",
-            value=f"Vonal: {i['line']}\nForgalmi: {i['trip']}\nCél: {i['dest']}",
-            inline=False
-        )
-        field_count += 1
-
-    embeds.append(embed)
-    for e in embeds:
-        await ctx.send(embed=e)
-
-
-@bot.command()
-async def dpmbk2today(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_k2(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
-
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett K2 villamos.")
-
-    out = [f"🚋 K2 – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
-
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
-
-@bot.command()
-async def dpmbk2(ctx):
-    active = {}
-
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ API hiba: {r.status}")
-
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-
-        except Exception as e:
-            return await ctx.send(f"❌ API hiba: {e}")
-
-    vehicles = data.get("Vehicles", [])
-
-    for v in vehicles:
-        line = v.get("LineName")
-        if line != "K2":
-            continue   # 🔴 EZ HIÁNYZOTT
-
-        vehicle_label = str(v.get("ID", ""))
-        lat = v.get("Lat")
-        lon = v.get("Lng")
-
-        if lat is None or lon is None:
-            continue
-
-        trip_id = str(v.get("Course", "Ismeretlen"))
-        dest = v.get("FinalStopName", "Ismeretlen")
-
-        active[vehicle_label] = {
-            "line": line,
-            "dest": dest,
-            "trip": trip_id,
-            "lat": lat,
-            "lon": lon
-        }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív K2 villamos.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív K2 villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív K2 villamosok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        embed.add_field(
-            name=reg,
-            value=(
-                f"Vonal: {i['line']}\n"
-                f"Forgalmi: {i['trip']}\n"
-                f"Cél: {i['dest']}"
-            ),
-            inline=False
-        )
-        field_count += 1
-
-    embeds.append(embed)
-    for e in embeds:
-        await ctx.send(embed=e)
-
-
-
-@bot.command()
-async def dpmbt2today(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_t2(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
-
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett T2 villamos.")
-
-    out = [f"🚋 T2 – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
-
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
-
-@bot.command()
-async def dpmbt2(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")  # BOM kezelése
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))     # Forgalmi
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            # Csak T3-asok
-            if not is_t2(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,    # hozzáadva a forgalmi
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív T2 villamos.")
-
-    # EMBED DARABOLÁS
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív T2 villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(title="🚋 Aktív T2 villamosok (folytatás)", color=0xff0000)
-            field_count = 0
-
-        embed.add_field(
-            name=f"{reg}",
-            value=f"Vonal: {i['line']}\nForgalmi: {i['trip']}\nCél: {i['dest']}",
-            inline=False
-        )
-        field_count += 1
-
-    embeds.append(embed)
-    for e in embeds:
-        await ctx.send(embed=e)
-
-
-
-@bot.command()
-async def dpmbkt8today(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_kt8(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
-
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett KT8D villamos.")
-
-    out = [f"🚋 KT8D – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
-
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
-
-@bot.command()
-async def dpmbkt8(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")  # BOM kezelése
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))     # Forgalmi
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            # Csak KT8D villamosok
-            if not is_kt8(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            # Altípus meghatározása
-            num = int(vehicle_label) if vehicle_label.isdigit() else 0
-            if 1729 <= num <= 1735:
-                subtype = "Tatra KT8D5N"
-            else:
-                subtype = "Tatra KT8D5R.N2"
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon,
-                "subtype": subtype
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív KT8D villamos.")
-
-    # EMBED DARABOLÁS
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív KT8D villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(title="🚋 Aktív KT8D villamosok (folytatás)", color=0xff0000)
-            field_count = 0
-
-        embed.add_field(
-            name=f"{reg}",
-            value=f"Altípus: {i['subtype']}\nVonal: {i['line']}\nForgalmi: {i['trip']}\nCél: {i['dest']}",
-            inline=False
-        )
-        field_count += 1
-
-    embeds.append(embed)
-    for e in embeds:
-        await ctx.send(embed=e)
-        
-def get_vario_type(reg):
-    if not reg:
-        return None
-    reg = str(reg)
-
-    if is_lf2(reg):
-        return "Vario LF2R.E"
-    elif is_lfr(reg):
-        return "Vario LFR.E"
-    else:
-        return "Ismeretlen"
-
-
-@bot.command()
-async def dpmbvario(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            idb = v.get("IDB")
-            idc = v.get("IDC")
-
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_lf2(vehicle_label) and not is_lfr(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            # Szerelvény összeállítása
-            consist = vehicle_label
-            if idb:
-                consist += f"+{idb}"
-                if idc:
-                    consist += f"+{idc}"
-
-            # Típusok meghatározása
-            types = []
-
-            main_type = get_vario_type(vehicle_label)
-            if main_type:
-                types.append(main_type)
-
-            if idb:
-                t = get_vario_type(idb)
-                if t:
-                    types.append(t)
-
-            if idc:
-                t = get_vario_type(idc)
-                if t:
-                    types.append(t)
-
-            subtype = " + ".join(types)
-
-            active[vehicle_label] = {
-                "consist": consist if idb else vehicle_label,
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon,
-                "subtype": subtype
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív Vario villamos.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív Vario villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív Vario villamosok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        embed.add_field(
-            name=f"{i['consist']}",
-            value=(
-                f"Altípus: {i['subtype']}\n"
-                f"Vonal: {i['line']}\n"
-                f"Forgalmi: {i['trip']}\n"
-                f"Cél: {i['dest']}"
-            ),
-            inline=False
-        )
-        field_count += 1
-
-    if embed.fields:
-        embeds.append(embed)
-
-    for e in embeds:
-        await ctx.send(embed=e)
-        
-@bot.command()
-async def dpmbanitra(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_antira(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív Anitra villamos.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív Anitra villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív Anitra villamosok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        value_text = (
-            f"Vonal: {i['line']}\n"
-            f"Forgalmi: {i['trip']}\n"
-            f"Cél: {i['dest']}"
-        )
-
-        embed.add_field(
-            name=f"{reg}",
-            value=value_text,
-            inline=False
-        )
-        field_count += 1
-
-    # Csak akkor adjuk hozzá az utolsó embedet, ha nem üres
-    if embed.fields:
-        embeds.append(embed)
-
-    # KÜLDÉS ASZINKRON FÜGGVÉNYEN BELÜL
-    for e in embeds:
-        await ctx.send(embed=e)
-        
-@bot.command()
-async def dpmbevo(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_evo(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív EVO 2 villamos.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív EVO 2 villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív EVO 2 villamosok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        value_text = (
-            f"Vonal: {i['line']}\n"
-            f"Forgalmi: {i['trip']}\n"
-            f"Cél: {i['dest']}"
-        )
-
-        embed.add_field(
-            name=f"{reg}",
-            value=value_text,
-            inline=False
-        )
-        field_count += 1
-
-    # Csak akkor adjuk hozzá az utolsó embedet, ha nem üres
-    if embed.fields:
-        embeds.append(embed)
-
-    # KÜLDÉS ASZINKRON FÜGGVÉNYEN BELÜL
-    for e in embeds:
-        await ctx.send(embed=e)
-        
-@bot.command()
-async def dpmb13t(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_13t(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív Skoda 13T villamos.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív Skoda 13T villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív Skoda 13T villamosok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        value_text = (
-            f"Vonal: {i['line']}\n"
-            f"Forgalmi: {i['trip']}\n"
-            f"Cél: {i['dest']}"
-        )
-
-        embed.add_field(
-            name=f"{reg}",
-            value=value_text,
-            inline=False
-        )
-        field_count += 1
-
-    # Csak akkor adjuk hozzá az utolsó embedet, ha nem üres
-    if embed.fields:
-        embeds.append(embed)
-
-    # KÜLDÉS ASZINKRON FÜGGVÉNYEN BELÜL
-    for e in embeds:
-        await ctx.send(embed=e)
-        
-@bot.command()
-async def dpmb45t(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_45t(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív Anitra villamos.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív Anitra villamosok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív Anitra villamosok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        value_text = (
-            f"Vonal: {i['line']}\n"
-            f"Forgalmi: {i['trip']}\n"
-            f"Cél: {i['dest']}"
-        )
-
-        embed.add_field(
-            name=f"{reg}",
-            value=value_text,
-            inline=False
-        )
-        field_count += 1
-
-    # Csak akkor adjuk hozzá az utolsó embedet, ha nem üres
-    if embed.fields:
-        embeds.append(embed)
-
-    # KÜLDÉS ASZINKRON FÜGGVÉNYEN BELÜL
-    for e in embeds:
-        await ctx.send(embed=e)
-        
-#=======================
-# SKODA Trolik
-#=======================
-
-@bot.command()
-async def dpmb26trtoday(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_26tr(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
-
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett Skoda 26Tr trolibusz.")
-
-    out = [f"🚋 Skoda 26Tr – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
-
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
-
-@bot.command()
-async def dpmb26tr(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_26tr(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív Skoda 26Tr trolibusz.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív Skoda 26Tr trolibuszok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív Skoda 26Tr trolibuszok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        value_text = (
-            f"Vonal: {i['line']}\n"
-            f"Forgalmi: {i['trip']}\n"
-            f"Cél: {i['dest']}"
-        )
-
-        embed.add_field(
-            name=f"{reg}",
-            value=value_text,
-            inline=False
-        )
-        field_count += 1
-
-    # Csak akkor adjuk hozzá az utolsó embedet, ha nem üres
-    if embed.fields:
-        embeds.append(embed)
-
-    # KÜLDÉS ASZINKRON FÜGGVÉNYEN BELÜL
-    for e in embeds:
-        await ctx.send(embed=e)
-        
-@bot.command()
-async def dpmb27trtoday(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_27tr(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
-
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett Skoda 27Tr trolibusz.")
+def make_history_command(type_key):
+    async def history(ctx, date: str = None):
+        if date and not valid_day(date):
+            return await ctx.send(f"❌ Érvénytelen dátum: {date} (ÉÉÉÉ-HH-NN)")
+        day = date or datetime.now().strftime("%Y-%m-%d")
 
-    out = [f"🚋 Skoda 27Tr – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
+        async def build():
+            vehicles = await query_day_activity(day, fleet.matcher(type_key))
+            if not vehicles:
+                return text_payload(empty_message(type_key, day))
+            return text_payload(render_history(type_key, day, vehicles))
 
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
+        await send_payload(ctx, await rendered((f"dpmb{type_key}today", (day,), day), build))
+    return history
 
-@bot.command()
-async def dpmb27tr(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_27tr(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív Skoda 27Tr trolibusz.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív Skoda 27Tr trolibuszok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív Skoda 27Tr trolibuszok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        value_text = (
-            f"Vonal: {i['line']}\n"
-            f"Forgalmi: {i['trip']}\n"
-            f"Cél: {i['dest']}"
-        )
-
-        embed.add_field(
-            name=f"{reg}",
-            value=value_text,
-            inline=False
-        )
-        field_count += 1
-
-    # Csak akkor adjuk hozzá az utolsó embedet, ha nem üres
-    if embed.fields:
-        embeds.append(embed)
-
-    # KÜLDÉS ASZINKRON FÜGGVÉNYEN BELÜL
-    for e in embeds:
-        await ctx.send(embed=e)
-        
-@bot.command()
-async def dpmb31trtoday(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_31tr(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
-
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett Skoda 31Tr trolibusz.")
-
-    out = [f"🚋 Skoda 31Tr – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
-
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
-
-@bot.command()
-async def dpmb31tr(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_31tr(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív Skoda 31Tr trolibusz.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív Skoda 31Tr trolibuszok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív Skoda 31Tr trolibuszok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        value_text = (
-            f"Vonal: {i['line']}\n"
-            f"Forgalmi: {i['trip']}\n"
-            f"Cél: {i['dest']}"
-        )
-
-        embed.add_field(
-            name=f"{reg}",
-            value=value_text,
-            inline=False
-        )
-        field_count += 1
-
-    # Csak akkor adjuk hozzá az utolsó embedet, ha nem üres
-    if embed.fields:
-        embeds.append(embed)
+def register_fleet_commands():
+    for type_key, info in fleet.types.items():
+        bot.command(name=f"dpmb{type_key}", help=f"Aktív {info['name']} járművek")(
+            make_live_command(type_key))
+        bot.command(name=f"dpmb{type_key}today", help=f"{info['name']} járművek egy napon (ÉÉÉÉ-HH-NN)")(
+            make_history_command(type_key))
 
-    # KÜLDÉS ASZINKRON FÜGGVÉNYEN BELÜL
-    for e in embeds:
-        await ctx.send(embed=e)
-
-@bot.command()
-async def dpmb32trtoday(ctx, date: str = None):
-    day = date or datetime.now().strftime("%Y-%m-%d")
-    veh_dir = "logs/veh"
-    t3s = {}
-
-    for fname in os.listdir(veh_dir):
-        if not fname.endswith(".txt"):
-            continue
-        reg = fname.replace(".txt","")
-        if not is_32tr(reg):
-            continue
-
-        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(day):
-                    ts = line.split(" - ")[0]
-                    trip_id = line.split("ID ")[1].split(" ")[0]
-                    line_no = line.split("Vonal ")[1].split(" ")[0]
-                    t3s.setdefault(reg, []).append((ts, line_no, trip_id))
-
-    if not t3s:
-        return await ctx.send(f"🚫 {day} napon nem közlekedett Skoda 32Tr trolibusz.")
-
-    out = [f"🚋 Skoda 32Tr – forgalomban ({day})"]
-    for reg in sorted(t3s):
-        first = min(t3s[reg], key=lambda x: x[0])
-        last = max(t3s[reg], key=lambda x: x[0])
-        out.append(f"{reg} — {first[0][11:16]} → {last[0][11:16]} (vonal {first[1]})")
-
-    msg = "\n".join(out)
-    for i in range(0, len(msg), 1900):
-        await ctx.send(msg[i:i+1900])
+register_fleet_commands()
 
 @bot.command()
-async def dpmb32tr(ctx):
-    active = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(API_URL, timeout=10) as r:
-                if r.status != 200:
-                    return await ctx.send(f"❌ Hiba az API lekéréskor: {r.status}")
-                text = await r.text(encoding="utf-8-sig")
-                data = json.loads(text)
-        except Exception as e:
-            return await ctx.send(f"❌ Hiba az API lekéréskor: {e}")
-
-        vehicles = data.get("Vehicles", [])
-        for v in vehicles:
-            vehicle_label = str(v.get("ID", ""))
-            trip_id = str(v.get("Course", "Unknown"))
-            line = v.get("LineName", "Ismeretlen")
-            dest = v.get("FinalStopName", "Ismeretlen")
-            lat = v.get("Lat")
-            lon = v.get("Lng")
-
-            if not is_32tr(vehicle_label):
-                continue
-            if lat is None or lon is None:
-                continue
-
-            active[vehicle_label] = {
-                "line": line,
-                "dest": dest,
-                "trip": trip_id,
-                "lat": lat,
-                "lon": lon
-            }
-
-    if not active:
-        return await ctx.send("🚫 Nincs aktív Skoda 32Tr trolibusz.")
-
-    MAX_FIELDS = 20
-    embeds = []
-    embed = discord.Embed(title="🚋 Aktív Skoda 32Tr trolibuszok", color=0xff0000)
-    field_count = 0
-
-    for reg, i in sorted(active.items(), key=lambda x: int(x[0])):
-        if field_count >= MAX_FIELDS:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title="🚋 Aktív Skoda 32Tr trolibuszok (folytatás)",
-                color=0xff0000
-            )
-            field_count = 0
-
-        value_text = (
-            f"Vonal: {i['line']}\n"
-            f"Forgalmi: {i['trip']}\n"
-            f"Cél: {i['dest']}"
-        )
-
-        embed.add_field(
-            name=f"{reg}",
-            value=value_text,
-            inline=False
+async def dpmbstatus(ctx):
+    """Bot belső állapota (monitorozás)"""
+    age = int(time.monotonic() - snapshot["fetched_at"]) if snapshot["data"] is not None else None
+    lines = [
+        "📊 Bot állapot",
+        f"Feed verzió: {snapshot['version'] or 'nincs'}",
+        f"Pillanatkép kora: {age if age is not None else '-'} mp",
+        f"Lekérések: {stats['polls']}",
+        f"Kihagyott (változatlan) lekérések: {stats['skipped_polls']}",
+        f"Válasz cache: {len(render_cache)} elem, {stats['render_hits']} találat / {stats['render_misses']} renderelés",
+        f"Összevont egyidejű kérések: {stats['coalesced']}",
+        f"Út vége türelmi idő: {END_GRACE_PERIOD} mp / {END_GRACE_POLLS} lekérés – "
+        f"elnyelt kimaradás: {stats['suppressed_flaps']}, lezárt inaktív út: {stats['inactive_ends']}",
+    ]
+    sync = gitsync.stats
+    if gitsync.progress["state"] != "idle":
+        lines.append(f"GitHub sync: {gitsync.progress['state']} {gitsync.progress['done']}/{gitsync.progress['total']}")
+    else:
+        lines.append(
+            f"GitHub sync: {sync['cycles']} kör ({sync['failed_cycles']} hibás), {sync['files']} fájl "
+            f"({sync['reused_blobs']} feltöltés nélkül), "
+            f"{sync['requests']} kérés ({sync['retries']} újra), utolsó: {sync['last_duration'] or '-'} mp"
         )
-        field_count += 1
-
-    # Csak akkor adjuk hozzá az utolsó embedet, ha nem üres
-    if embed.fields:
-        embeds.append(embed)
-
-    # KÜLDÉS ASZINKRON FÜGGVÉNYEN BELÜL
-    for e in embeds:
-        await ctx.send(embed=e)
+    if gitsync.progress["pending"]:
+        lines.append(f"GitHub sync: {gitsync.progress['pending']} fájl vár a rate limit visszaállására")
+    if gitsync.rate["remaining"] is not None:
+        lines.append(f"GitHub API keret: {gitsync.rate['remaining']} kérés")
+    if sync["last_error"]:
+        lines.append(f"GitHub sync utolsó hiba: {sync['last_error']}")
+    await ctx.send("\n".join(lines))
 
 # =======================
 # START
@@ -2136,10 +1142,20 @@ async def on_ready():
     if getattr(bot, "ready_done", False):
         return
     bot.ready_done = True
-    ensure_dirs()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(shutdown()))
+    except NotImplementedError:
+        pass  # Windows: nincs signal handler, marad az atexit
+    await run_io(ensure_dirs)
+    await run_io(build_last_trip_index)
+    await get_day_index(datetime.now().strftime("%Y-%m-%d"))
+    await restore_checkpoint()
     print(f"Bejelentkezve mint {bot.user}")
     logger_loop.start()
+    log_flush_loop.start()
+    archive_logs.start()
     git_sync_logs.start()
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    bot.run(TOKEN)
 
@@ -0,0 +1,289 @@
+"""
+Optional SQLite store for trip events and vehicle sightings
+Enabled by setting SQLITE_PATH (e.g. SQLITE_PATH=logs/dpmb.sqlite3). The text logs stay the
+primary record; the store mirrors them so history queries become indexed lookups.
+
+Rows are buffered in memory and committed in one transaction per poll (commit_batch).
+
+The store answers a day's queries only if it holds the whole day (is_complete): days imported by
+migrate, and days this process has been writing since midnight. Closed days of the latter kind
+are recorded in the complete_days table. A day the store joined mid-way (SQLITE_PATH turned on,
+a restart) is read from the log files instead.
+
+Import existing text logs:
+    python store.py migrate [logs_dir]
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# =======================
+# CONFIGURATION
+# =======================
+SQLITE_PATH = os.getenv("SQLITE_PATH", "")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sightings (
+    date    TEXT NOT NULL,
+    ts      TEXT NOT NULL,
+    vehicle TEXT NOT NULL,
+    course  TEXT NOT NULL,
+    line    TEXT,
+    dest    TEXT,
+    UNIQUE (vehicle, ts, course)
+);
+CREATE INDEX IF NOT EXISTS sightings_date_vehicle ON sightings (date, vehicle);
+CREATE INDEX IF NOT EXISTS sightings_date_course ON sightings (date, course);
+CREATE INDEX IF NOT EXISTS sightings_date_line ON sightings (date, line);
+
+CREATE TABLE IF NOT EXISTS trip_events (
+    date    TEXT NOT NULL,
+    ts      TEXT NOT NULL,
+    event   TEXT NOT NULL,
+    vehicle TEXT NOT NULL,
+    course  TEXT NOT NULL,
+    line    TEXT,
+    dest    TEXT,
+    UNIQUE (vehicle, ts, course, event)
+);
+CREATE INDEX IF NOT EXISTS trip_events_date_vehicle ON trip_events (date, vehicle);
+CREATE INDEX IF NOT EXISTS trip_events_date_course ON trip_events (date, course);
+CREATE INDEX IF NOT EXISTS trip_events_date_line ON trip_events (date, line);
+
+CREATE TABLE IF NOT EXISTS complete_days (
+    date    TEXT PRIMARY KEY
+);
+"""
+
+# =======================
+# STATE
+# =======================
+_conn = None
+_lock = threading.Lock()  # one connection, used from the I/O threads
+_sightings = []  # rows waiting for the next commit_batch()
+_events = []
+_open_days = set()  # days this process has committed rows for and not yet closed
+# start of this process: days starting later are stored whole
+_started = time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def enabled():
+    return bool(SQLITE_PATH)
+
+
+def connect(path=None):
+    """Open (and create) the database in WAL mode; returns the shared connection"""
+    global _conn
+    if _conn is None:
+        path = path or SQLITE_PATH
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _conn = sqlite3.connect(path, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(SCHEMA)
+    return _conn
+
+
+def add_sighting(ts, vehicle, course, line, dest):
+    """Buffer one vehicle log line ("YYYY-MM-DD HH:MM:SS" timestamp)"""
+    _sightings.append((ts[:10], ts, vehicle, course, line, dest))
+
+
+def add_event(ts, event, vehicle, course, line, dest):
+    """Buffer one START/END trip event"""
+    _events.append((ts[:10], ts, event, vehicle, course, line, dest))
+
+
+def _covered(day):
+    return _started <= f"{day} 00:00:00"
+
+
+def _mark_complete(conn, days):
+    conn.executemany("INSERT OR IGNORE INTO complete_days (date) VALUES (?)", [(day,) for day in days])
+
+
+def take_batch():
+    """Hand over the buffered rows (call on the event loop, then commit them on the I/O thread)"""
+    global _sightings, _events
+    batch = (_sightings, _events)
+    _sightings, _events = [], []
+    return batch
+
+
+def commit_batch(batch):
+    """Write one poll's rows in a single transaction"""
+    sightings, events = batch
+    if not sightings and not events:
+        return
+    with _lock:
+        conn = connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO sightings (date, ts, vehicle, course, line, dest) "
+                "VALUES (?, ?, ?, ?, ?, ?)", sightings
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO trip_events (date, ts, event, vehicle, course, line, dest) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", events
+            )
+            # earlier days are closed: remember those this process wrote from their first minute
+            days = {row[0] for row in sightings} | {row[0] for row in events}
+            _open_days.update(days)
+            closed = [day for day in _open_days if day < max(days)]
+            _mark_complete(conn, [day for day in closed if _covered(day)])
+            _open_days.difference_update(closed)
+
+
+def is_complete(day):
+    """Whether the store holds every row of the day (only then may it replace the log files)"""
+    if _covered(day):
+        return True
+    with _lock:
+        return connect().execute("SELECT 1 FROM complete_days WHERE date = ?", (day,)).fetchone() is not None
+
+
+def day_records(day):
+    """
+    Sightings of one day, grouped by vehicle (uses the (date, vehicle) index)
+
+    Returns:
+        dict: {vehicle: [(ts, line, course, dest), ...]} in time order
+    """
+    with _lock:
+        rows = connect().execute(
+            "SELECT vehicle, ts, line, course, dest FROM sightings "
+            "WHERE date = ? ORDER BY vehicle, ts", (day,)
+        ).fetchall()
+    found = {}
+    for vehicle, ts, line, course, dest in rows:
+        found.setdefault(vehicle, []).append((ts, line, course, dest))
+    return found
+
+
+def vehicle_records(day, vehicle):
+    """Sightings of one vehicle on one day as [(ts, line, course, dest), ...] (uses the (date, vehicle) index)"""
+    with _lock:
+        return connect().execute(
+            "SELECT ts, line, course, dest FROM sightings "
+            "WHERE date = ? AND vehicle = ? ORDER BY ts", (day, vehicle)
+        ).fetchall()
+
+
+def course_events(day, course):
+    """START/END events of one course on one day (uses the (date, course) index)"""
+    with _lock:
+        return connect().execute(
+            "SELECT ts, event, vehicle, line, dest FROM trip_events "
+            "WHERE date = ? AND course = ? ORDER BY ts", (day, course)
+        ).fetchall()
+
+
+def line_vehicles(day, line):
+    """Vehicles seen on a line on one day (uses the (date, line) index)"""
+    with _lock:
+        rows = connect().execute(
+            "SELECT DISTINCT vehicle FROM sightings WHERE date = ? AND line = ?", (day, line)
+        ).fetchall()
+    return [vehicle for (vehicle,) in rows]
+
+
+# =======================
+# MIGRATION
+# =======================
+
+def _parse_sighting(text):
+    # "YYYY-MM-DD HH:MM:SS - ID 01203 - Vonal 4 - Destination"
+    parts = text.split(" - ", 3)
+    if len(parts) < 4 or not parts[1].startswith("ID ") or not parts[2].startswith("Vonal "):
+        return None
+    return parts[0], parts[1][3:], parts[2][6:], parts[3]
+
+
+def parse_event(text):
+    """Split a course log line into (ts, event, vehicle, line, dest), or None"""
+    # "YYYY-MM-DD HH:MM:SS | START | Jármű: 1234 | Vonal: 26 | Cél: Arena Brno"
+    parts = [p.strip() for p in text.split(" | ")]
+    if len(parts) < 4 or parts[1] not in ("START", "END"):
+        return None
+    vehicle = parts[2].split(": ", 1)[-1]
+    line = parts[3].split(": ", 1)[-1]
+    dest = parts[4].split(": ", 1)[-1] if len(parts) > 4 else None
+    return parts[0], parts[1], vehicle, line, dest
+
+
+def migrate(logs_dir="logs"):
+    """
+    Import logs/veh/*.txt and logs/<date>/*.txt into the store (safe to re-run)
+    Days found in the text logs are marked complete (today excepted, see is_complete). Days
+    already packed into logs/archive are not imported; the history queries keep reading them
+    from their archive segments.
+    """
+    conn = connect()
+    sightings = events = 0
+    imported = set()  # days of the imported sightings
+
+    veh_dir = os.path.join(logs_dir, "veh")
+    for fname in sorted(os.listdir(veh_dir)) if os.path.isdir(veh_dir) else []:
+        if not fname.endswith(".txt"):
+            continue
+        vehicle = fname[:-4]
+        rows = []
+        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
+            for text in f:
+                parsed = _parse_sighting(text.rstrip("\n"))
+                if parsed:
+                    ts, course, line, dest = parsed
+                    rows.append((ts[:10], ts, vehicle, course, line, dest))
+                    imported.add(ts[:10])
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO sightings (date, ts, vehicle, course, line, dest) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+        sightings += len(rows)
+
+    for day in sorted(os.listdir(logs_dir)):
+        day_dir = os.path.join(logs_dir, day)
+        if len(day) != 10 or not os.path.isdir(day_dir):
+            continue
+        rows = []
+        for fname in os.listdir(day_dir):
+            if not fname.endswith(".txt"):
+                continue
+            course = fname[:-4]
+            with open(os.path.join(day_dir, fname), "r", encoding="utf-8") as f:
+                for text in f:
+                    parsed = parse_event(text.rstrip("\n"))
+                    if parsed:
+                        ts, event, vehicle, line, dest = parsed
+                        rows.append((ts[:10], ts, event, vehicle, course, line, dest))
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO trip_events (date, ts, event, vehicle, course, line, dest) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        events += len(rows)
+
+    # today stays out: it only counts as whole while one process writes it from midnight on
+    today = time.strftime("%Y-%m-%d")
+    with conn:
+        _mark_complete(conn, sorted(day for day in imported if day < today))
+
+    return sightings, events
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: SQLITE_PATH=logs/dpmb.sqlite3 python store.py migrate [logs_dir]")
+        sys.exit(1)
+    if not enabled():
+        print("SQLITE_PATH is not set")
+        sys.exit(1)
+    logs_dir = sys.argv[2] if len(sys.argv) > 2 else "logs"
+    s, e = migrate(logs_dir)
+    print(f"Imported {s} sightings and {e} trip events from {logs_dir}/ into {SQLITE_PATH}")
@@ -0,0 +1,110 @@
+"""
+In-memory stand-in for the parts of the GitHub Git Data API that gitsync uses
+(refs, commits, recursive trees, blobs), served by aiohttp on a local port.
+Point gitsync.GITHUB_API_URL at FakeGitHub.url.
+
+Knobs for the tests:
+    remaining / reset  rate limit window: every request costs one, at 0 the answer is 403
+    fail               this many next requests answer 502 (retried by gitsync)
+    broken             {"trees", ...}: these POST endpoints answer 422 (not retried)
+"""
+
+import base64
+import hashlib
+import json
+import time
+
+from aiohttp import web
+
+
+def blob_sha(content):
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class FakeGitHub:
+    def __init__(self, branch="main"):
+        self.branch = branch
+        self.blobs = {}  # sha -> bytes
+        self.trees = {"t0": {}}  # sha -> {path: blob sha}
+        self.commits = {"c0": {"tree": "t0", "parents": []}}
+        self.refs = {branch: "c0"}
+        self.calls = []  # (method, endpoint)
+        self.remaining = 5000
+        self.reset = int(time.time()) + 3600
+        self.fail = 0
+        self.broken = set()
+        self.url = None
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route("*", "/repos/{owner}/{repo}/git/{rest:.*}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = "http://127.0.0.1:%d" % self._runner.addresses[0][1]
+        return self
+
+    async def close(self):
+        await self._runner.cleanup()
+
+    def head_files(self):
+        """{path: content} of the branch head"""
+        tree = self.trees[self.commits[self.refs[self.branch]]["tree"]]
+        return {path: self.blobs[sha] for path, sha in tree.items()}
+
+    def count(self, method, endpoint):
+        return sum(1 for call in self.calls if call == (method, endpoint))
+
+    def _reply(self, status, body):
+        return web.json_response(body, status=status, headers={
+            "X-RateLimit-Remaining": str(max(self.remaining, 0)),
+            "X-RateLimit-Reset": str(self.reset),
+        })
+
+    async def _handle(self, request):
+        rest = request.match_info["rest"].split("/")
+        method = request.method
+        self.calls.append((method, rest[0]))
+        if self.remaining <= 0:
+            return self._reply(403, {"message": "API rate limit exceeded"})
+        self.remaining -= 1
+        if self.fail > 0:
+            self.fail -= 1
+            return self._reply(502, {"message": "Bad Gateway"})
+        if method == "POST" and rest[0] in self.broken:
+            return self._reply(422, {"message": f"{rest[0]} rejected"})
+
+        body = await request.json() if method in ("POST", "PATCH") else None
+        if method == "GET" and rest[:2] == ["ref", "heads"]:
+            return self._reply(200, {"object": {"sha": self.refs[rest[2]]}})
+        if method == "GET" and rest[0] == "commits":
+            return self._reply(200, {"sha": rest[1], "tree": {"sha": self.commits[rest[1]]["tree"]}})
+        if method == "GET" and rest[0] == "trees":
+            tree = self.trees[rest[1]]
+            return self._reply(200, {"sha": rest[1], "truncated": False, "tree": [
+                {"path": path, "mode": "100644", "type": "blob", "sha": sha} for path, sha in tree.items()
+            ]})
+        if method == "POST" and rest == ["blobs"]:
+            content = base64.b64decode(body["content"])
+            sha = blob_sha(content)
+            self.blobs[sha] = content
+            return self._reply(201, {"sha": sha})
+        if method == "POST" and rest == ["trees"]:
+            tree = dict(self.trees[body["base_tree"]])
+            for item in body["tree"]:
+                if item["sha"] not in self.blobs:
+                    return self._reply(422, {"message": f"unknown blob {item['sha']}"})
+                tree[item["path"]] = item["sha"]
+            sha = hashlib.sha1(json.dumps(sorted(tree.items())).encode()).hexdigest()
+            self.trees[sha] = tree
+            return self._reply(201, {"sha": sha})
+        if method == "POST" and rest == ["commits"]:
+            sha = hashlib.sha1(f"{len(self.commits)}:{body['tree']}".encode()).hexdigest()
+            self.commits[sha] = {"tree": body["tree"], "parents": body["parents"]}
+            return self._reply(201, {"sha": sha})
+        if method == "PATCH" and rest[:2] == ["refs", "heads"]:
+            self.refs[rest[2]] = body["sha"]
+            return self._reply(200, {"object": {"sha": body["sha"]}})
+        return self._reply(404, {"message": "Not Found"})
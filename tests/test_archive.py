@@ -0,0 +1,71 @@
+import gzip
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import archive
+import vehlog
+
+OLD_DAYS = ["2020-01-01", "2020-01-02"]
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        archive._indexes.clear()
+        vehlog._offsets.clear()
+        self.today = datetime.now().strftime("%Y-%m-%d")
+        self.course_files = {}
+        for day in OLD_DAYS + [self.today]:
+            os.makedirs(f"logs/{day}")
+            content = f"{day} 05:00:00 | START | Jármű: 1604 | Vonal: 4 | Cél: Ečerova\n".encode("utf-8")
+            with open(f"logs/{day}/00401.txt", "wb") as f:
+                f.write(content)
+            self.course_files[day] = content
+        os.makedirs("logs/veh")
+        self.veh_lines = {}
+        for reg in ("1604", "1230"):
+            with open(f"logs/veh/{reg}.txt", "w", encoding="utf-8") as f:
+                for day in OLD_DAYS + [self.today]:
+                    lines = [f"{day} {h:02d}:00:00 - ID 00401 - Vonal 4 - Ečerova {reg}" for h in (5, 6)]
+                    f.write("".join(line + "\n" for line in lines))
+                    self.veh_lines[reg, day] = lines
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(archive.archive_closed_days(), {day: 3 for day in OLD_DAYS})
+        for day in OLD_DAYS:
+            self.assertTrue(archive.has_day(day))
+            self.assertFalse(os.path.isdir(f"logs/{day}"))
+            self.assertEqual(archive.read_entry(day, "course/00401.txt"), self.course_files[day])
+            self.assertIsNone(archive.read_entry(day, "course/09999.txt"))
+            self.assertEqual(
+                archive.read_vehicles(day, lambda reg: True),
+                {reg: self.veh_lines[reg, day] for reg in ("1604", "1230")}
+            )
+            self.assertEqual(archive.read_vehicles(day, lambda reg: reg == "1230"),
+                             {"1230": self.veh_lines["1230", day]})
+            # a plain gzip reader sees the index followed by every entry
+            with gzip.open(archive.segment_path(day), "rb") as f:
+                self.assertIn(self.course_files[day], f.read())
+
+    def test_raw_logs_of_open_days_stay(self):
+        archive.archive_closed_days()
+        self.assertTrue(os.path.isdir(f"logs/{self.today}"))
+        for reg in ("1604", "1230"):
+            with open(f"logs/veh/{reg}.txt", encoding="utf-8") as f:
+                self.assertEqual(f.read().splitlines(), self.veh_lines[reg, self.today])
+
+    def test_rerun_archives_nothing(self):
+        archive.archive_closed_days()
+        self.assertEqual(archive.archive_closed_days(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
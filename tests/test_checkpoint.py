@@ -0,0 +1,46 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import checkpoint
+import main
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.state = {"active_vehicles": {"1604": {"course": "00401", "line_name": "4", "destination": "Ečerova"}}}
+
+    def tearDown(self):
+        main.tracker_restored = False
+        main.active_vehicles.clear()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_round_trip_and_staleness(self):
+        checkpoint.save("main", self.state)
+        state, age = checkpoint.load("main")
+        self.assertEqual(state, self.state)
+        with mock.patch("time.time", return_value=time.time() + checkpoint.CHECKPOINT_MAX_AGE + 1):
+            state, age = checkpoint.load("main")
+        self.assertIsNone(state)
+        self.assertGreater(age, checkpoint.CHECKPOINT_MAX_AGE)
+        self.assertEqual(checkpoint.load("missing"), (None, None))
+
+    def test_exit_before_restore_keeps_the_checkpoint(self):
+        checkpoint.save("main", self.state)
+        main.tracker_restored = False
+        main.final_checkpoint()
+        self.assertEqual(checkpoint.load("main")[0], self.state)
+
+        main.tracker_restored = True
+        main.final_checkpoint()
+        self.assertEqual(checkpoint.load("main")[0]["active_vehicles"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+import main
+
+
+class FeedUnchangedTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = dict(main.processed_feed), dict(main.feed._digests)
+
+    def tearDown(self):
+        main.processed_feed.update(self.saved[0])
+        main.feed._digests.clear()
+        main.feed._digests.update(self.saved[1])
+
+    def test_not_modified_document_fetched_by_a_live_command_is_processed(self):
+        main.processed_feed.update(last_update="2026-10-18T10:00:00", digest="a")
+        # a live command fetched a newer document; the logger's next poll gets 304 for it
+        main.feed._digests[main.API_URL] = "b"
+        self.assertFalse(main.feed_unchanged({"LastUpdate": "2026-10-18T10:00:30"}))
+
+    def test_processed_document_is_skipped(self):
+        main.processed_feed.update(last_update="2026-10-18T10:00:00", digest="a")
+        main.feed._digests[main.API_URL] = "a"
+        self.assertTrue(main.feed_unchanged({"LastUpdate": "2026-10-18T10:00:00"}))
+        self.assertTrue(main.feed_unchanged({}))  # no LastUpdate: the content hash decides
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import asyncio
+import unittest
+
+import fleet
+import main
+
+
+class Ctx:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+
+class ClassifyTest(unittest.TestCase):
+    def test_registry_lookup(self):
+        self.assertEqual(fleet.classify("1604").type, "t3")
+        self.assertEqual(fleet.classify(1604).subtype, "Tatra T3G")
+        self.assertIsNone(fleet.classify("99999"))
+        self.assertIsNone(fleet.classify("Unknown"))
+
+    def test_digit_like_characters_are_not_numbers(self):
+        for reg in ("²", "1²", "①"):
+            self.assertIsNone(fleet.classify(reg))
+            self.assertIsNone(fleet.type_of(reg))
+
+    def test_commands_reject_them(self):
+        ctx = Ctx()
+        asyncio.run(main.dpmbveh.callback(ctx, "²"))
+        asyncio.run(main.dpmbcourse.callback(ctx, "²"))
+        self.assertEqual(ctx.sent, ["❌ Érvénytelen pályaszám: ²", "❌ Érvénytelen forgalmi: ²"])
+
+
+if __name__ == "__main__":
+    unittest.main()
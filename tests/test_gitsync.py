@@ -0,0 +1,135 @@
+import importlib
+import os
+import tempfile
+import time
+import unittest
+
+import gitsync
+from tests.fakegithub import FakeGitHub
+
+
+class GitSyncTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        os.makedirs("logs/veh")
+        self.github = await FakeGitHub().start()
+        self.restart()
+
+    async def asyncTearDown(self):
+        await self.github.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def restart(self):
+        """Fresh module state, as after a bot restart (the files under logs/ stay)"""
+        importlib.reload(gitsync)
+        gitsync.GITHUB_TOKEN = "token"
+        gitsync.GITHUB_REPO = "owner/repo"
+        gitsync.GITHUB_API_URL = self.github.url
+        gitsync.RETRY_BACKOFF = 0
+
+    def write_logs(self, count, prefix="1"):
+        for i in range(count):
+            with open(f"logs/veh/{prefix}{i:03d}.txt", "w", encoding="utf-8") as f:
+                f.write(f"2026-10-18 05:00:00 - ID {i:05d} - Vonal 4 - Cél {prefix}\n")
+
+    def local_files(self):
+        return {
+            path.replace(os.sep, "/"): open(path, "rb").read()
+            for path in gitsync.list_log_files()
+        }
+
+    async def test_changes_go_out_in_one_commit(self):
+        self.write_logs(30)
+        result = await gitsync.sync()
+        self.assertEqual(result["files"], 30)
+        self.assertEqual(self.github.count("PATCH", "refs"), 1)
+        self.assertEqual(self.github.head_files(), self.local_files())
+
+        with open("logs/veh/1007.txt", "a", encoding="utf-8") as f:
+            f.write("2026-10-18 05:10:00 - ID 00007 - Vonal 4 - Cél 1\n")
+        blobs = self.github.count("POST", "blobs")
+        result = await gitsync.sync()
+        self.assertEqual(result["files"], 1)
+        self.assertEqual(self.github.count("POST", "blobs"), blobs + 1)
+        self.assertEqual(self.github.head_files(), self.local_files())
+
+        result = await gitsync.sync()
+        self.assertIsNone(result["commit"])
+        self.assertEqual(self.github.count("PATCH", "refs"), 2)
+
+    async def test_lost_state_is_seeded_from_the_remote_tree(self):
+        self.write_logs(20)
+        await gitsync.sync()
+        os.remove(gitsync.STATE_FILE)
+        self.restart()
+        blobs = self.github.count("POST", "blobs")
+
+        result = await gitsync.sync()
+        self.assertIsNone(result["commit"])
+        self.assertEqual(self.github.count("POST", "blobs"), blobs)
+        self.assertEqual(gitsync.stats["seeded_files"], 20)
+
+    async def test_server_errors_are_retried(self):
+        self.write_logs(5)
+        self.github.fail = 3
+        result = await gitsync.sync()
+        self.assertEqual(result["files"], 5)
+        self.assertEqual(gitsync.stats["retries"], 3)
+        self.assertEqual(self.github.head_files(), self.local_files())
+
+    async def test_interrupted_cycle_resumes_from_the_journal(self):
+        self.write_logs(30)
+        self.github.broken = {"trees"}
+        with self.assertRaises(gitsync.SyncError):
+            await gitsync.sync()
+        self.assertTrue(os.path.exists(gitsync.JOURNAL_FILE))
+        uploaded = self.github.count("POST", "blobs")
+        self.assertEqual(uploaded, 30)
+
+        self.github.broken = set()
+        self.restart()
+        result = await gitsync.sync()
+        self.assertEqual(result["files"], 30)
+        self.assertEqual(self.github.count("POST", "blobs"), uploaded)
+        self.assertEqual(gitsync.stats["resumed_files"], 30)
+        self.assertFalse(os.path.exists(gitsync.JOURNAL_FILE))
+        self.assertEqual(self.github.head_files(), self.local_files())
+
+    async def test_rate_limit_pauses_and_resumes_after_the_reset(self):
+        self.write_logs(40)
+        # seeding (3) + commit (5) + reserve leave room for about 20 uploads
+        self.github.remaining = gitsync.RATE_LIMIT_RESERVE + 30
+        result = await gitsync.sync()
+        self.assertGreater(result["pending"], 0)
+        self.assertIsNotNone(result["commit"])
+        self.assertEqual(len(self.github.head_files()), 40 - result["pending"])
+        self.assertEqual(gitsync.stats["rate_pauses"], 1)
+        self.assertFalse(gitsync.due())  # the window has not reset yet
+
+        self.github.remaining = 5000
+        self.github.reset = int(time.time()) + 3600
+        gitsync.rate["reset"] = int(time.time()) - 1  # the window passed
+        self.assertTrue(gitsync.due())
+        result = await gitsync.sync()
+        self.assertEqual(result["pending"], 0)
+        self.assertEqual(self.github.head_files(), self.local_files())
+
+    async def test_exhausted_rate_limit_fails_the_cycle_and_keeps_the_backlog(self):
+        self.write_logs(3)
+        self.github.remaining = 0
+        with self.assertRaises(gitsync.RateLimited):
+            await gitsync.sync()
+        self.assertGreater(gitsync.progress["pending"], 0)
+
+        self.github.remaining = 5000
+        gitsync.rate["reset"] = int(time.time()) - 1
+        self.assertTrue(gitsync.due())
+        result = await gitsync.sync()
+        self.assertEqual(result["files"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
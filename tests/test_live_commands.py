@@ -0,0 +1,31 @@
+import unittest
+
+import main
+
+
+def feed(numbers, coupled=False):
+    return {"Vehicles": [
+        {"ID": n, "IDB": n + 1 if coupled else None, "Course": f"{i:05d}", "LineName": "4",
+         "FinalStopName": "Ečerova", "Lat": 49.2, "Lng": 16.6}
+        for i, n in enumerate(numbers)
+    ]}
+
+
+class RenderLiveTest(unittest.TestCase):
+    def test_continuation_embeds_keep_the_heading(self):
+        for type_key, numbers in (("13t", range(1901, 1926)), ("evo", range(1822, 1847))):
+            active = main.group_snapshot(feed(numbers))[type_key]
+            embeds = main.render_live(type_key, active)
+            title = f"🚋 Aktív {main.fleet.types[type_key]['name']} villamosok"
+            self.assertEqual([e.title for e in embeds], [title, f"{title} (folytatás)"])
+            self.assertEqual([len(e.fields) for e in embeds], [main.MAX_FIELDS, 5])
+
+    def test_field_names_follow_the_registry(self):
+        active = main.group_snapshot(feed([1730], coupled=True))["kt8"]
+        self.assertEqual([f.name for f in main.render_live("kt8", active)[0].fields], ["1730"])
+        active = main.group_snapshot(feed([1604], coupled=True))["t3"]
+        self.assertEqual([f.name for f in main.render_live("t3", active)[0].fields], ["1604+1605"])
+
+
+if __name__ == "__main__":
+    unittest.main()
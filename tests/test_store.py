@@ -0,0 +1,61 @@
+import os
+import tempfile
+import time
+import unittest
+
+import store
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        store._conn = None
+        store._open_days.clear()
+        store.connect("logs/test.sqlite3")
+        self.started = store._started
+        self.today = time.strftime("%Y-%m-%d")
+
+    def tearDown(self):
+        store._conn.close()
+        store._conn = None
+        store._started = self.started
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def write_veh_log(self, reg, days):
+        os.makedirs("logs/veh", exist_ok=True)
+        with open(f"logs/veh/{reg}.txt", "w", encoding="utf-8") as f:
+            for day in days:
+                f.write(f"{day} 05:00:00 - ID 00401 - Vonal 4 - Ečerova\n")
+                f.write(f"{day} 05:05:00 - ID 00401 - Vonal 4 - Ečerova\n")
+
+    def test_migrated_past_days_are_complete(self):
+        self.write_veh_log("1604", ["2026-01-01", self.today])
+        self.write_veh_log("1230", ["2026-01-01"])
+        self.assertEqual(store.migrate("logs"), (6, 0))
+        self.assertTrue(store.is_complete("2026-01-01"))
+        self.assertFalse(store.is_complete("2026-01-02"))
+        self.assertFalse(store.is_complete(self.today))  # unless this process ran since midnight
+        self.assertEqual(store.vehicle_records("2026-01-01", "1230"), [
+            ("2026-01-01 05:00:00", "4", "00401", "Ečerova"),
+            ("2026-01-01 05:05:00", "4", "00401", "Ečerova"),
+        ])
+        self.assertEqual(sorted(store.day_records("2026-01-01")), ["1230", "1604"])
+
+    def test_days_written_from_midnight_are_marked_when_closed(self):
+        store._started = "2026-01-01 23:00:00"
+        store.commit_batch(([("2026-01-01", "2026-01-01 23:30:00", "1604", "00401", "4", "X")], []))
+        store.commit_batch(([("2026-01-02", "2026-01-02 00:00:10", "1604", "00401", "4", "X")], []))
+        self.assertTrue(store.is_complete("2026-01-02"))  # running since before it began
+        store.commit_batch(([("2026-01-03", "2026-01-03 00:00:10", "1604", "00401", "4", "X")], []))
+
+        store._started = "2026-01-03 12:00:00"  # a later restart only knows the recorded days
+        self.assertFalse(store.is_complete("2026-01-01"))  # joined mid-way
+        self.assertTrue(store.is_complete("2026-01-02"))
+        self.assertFalse(store.is_complete("2026-01-03"))
+
+
+if __name__ == "__main__":
+    unittest.main()
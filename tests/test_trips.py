@@ -0,0 +1,47 @@
+import unittest
+
+from trips import MAX_GAP, Trip, reconstruct
+
+
+class ReconstructTest(unittest.TestCase):
+    def test_course_change_starts_a_new_trip(self):
+        sightings = [
+            ("2026-10-18 05:00:00", "4", "00401", "Ečerova"),
+            ("2026-10-18 05:05:00", "4", "00401", "Ečerova"),
+            ("2026-10-18 05:15:00", "4", "00401", "Bystrc"),  # same course, new sign
+            ("2026-10-18 05:35:00", "9", "00902", "Lesná"),
+        ]
+        self.assertEqual(list(reconstruct("1604", sightings)), [
+            Trip("1604", "00401", "4", "Bystrc", "2026-10-18 05:00:00", "2026-10-18 05:15:00", 900),
+            Trip("1604", "00902", "9", "Lesná", "2026-10-18 05:35:00", "2026-10-18 05:35:00", 0),
+        ])
+
+    def test_long_gap_ends_the_trip(self):
+        sightings = [
+            ("2026-10-18 05:00:00", "4", "00401", "Ečerova"),
+            ("2026-10-18 05:05:00", "4", "00401", "Ečerova"),
+            ("2026-10-18 05:20:00", "4", "00401", "Ečerova"),  # exactly MAX_GAP later
+            ("2026-10-18 05:35:01", "4", "00401", "Ečerova"),
+        ]
+        self.assertEqual(MAX_GAP, 900)
+        trips = list(reconstruct("1604", sightings))
+        self.assertEqual([(t.start, t.end) for t in trips], [
+            ("2026-10-18 05:00:00", "2026-10-18 05:20:00"),
+            ("2026-10-18 05:35:01", "2026-10-18 05:35:01"),
+        ])
+
+    def test_trip_across_midnight(self):
+        sightings = [
+            ("2026-10-17 23:55:00", "N89", "08901", "Hlavní nádraží"),
+            ("2026-10-18 00:05:00", "N89", "08901", "Hlavní nádraží"),
+        ]
+        (trip,) = reconstruct("3305", sightings)
+        self.assertEqual(trip.duration, 600)
+
+    def test_no_sightings(self):
+        self.assertEqual(list(reconstruct("1604", [])), [])
+        self.assertEqual(list(reconstruct("1604", iter([]))), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
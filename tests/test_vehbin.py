@@ -0,0 +1,77 @@
+import filecmp
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import vehbin
+
+DAYS = ["2026-10-16", "2026-10-17"]
+
+
+class VehBinTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        vehbin._tables.clear()
+        vehbin._pending.clear()
+        vehbin._complete = None
+        self.started = vehbin._started
+        os.makedirs("logs/veh")
+        for reg in ("1230", "1604", "3305"):
+            with open(f"logs/veh/{reg}.txt", "w", encoding="utf-8") as f:
+                for day in DAYS:
+                    for k in range(6):
+                        f.write(f"{day} {5 + k:02d}:{int(reg) % 60:02d}:00 - ID {k:05d} - Vonal {k % 3 + 1} - "
+                                f"Cél ő {reg[-1]}{k % 2}\n")
+
+    def tearDown(self):
+        vehbin._started = self.started
+        vehbin._complete = None
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_text_binary_text_round_trip_is_identical(self):
+        self.assertEqual(vehbin.text_to_bin("logs"), {day: 18 for day in DAYS})
+        for day in DAYS:
+            self.assertEqual(vehbin.bin_to_text(day, "out"), 18)
+        for reg in ("1230", "1604", "3305"):
+            self.assertTrue(filecmp.cmp(f"logs/veh/{reg}.txt", f"out/{reg}.txt", shallow=False), reg)
+
+    def test_truncated_trailing_record_is_ignored(self):
+        vehbin.text_to_bin("logs")
+        whole = vehbin.read_day(DAYS[0], lambda reg: True)
+        with open(vehbin.bin_path(DAYS[0]), "ab") as f:
+            f.write(vehbin.RECORD.pack(0, 1604, 0, 0, 0)[:7])  # torn write
+        self.assertEqual(vehbin.read_day(DAYS[0], lambda reg: True), whole)
+
+    def test_converted_past_days_are_complete(self):
+        vehbin.text_to_bin("logs")
+        for day in DAYS:
+            self.assertTrue(vehbin.is_complete(day))
+        self.assertFalse(vehbin.is_complete("2026-10-18"))  # no file
+
+    def test_days_joined_mid_way_are_not_complete(self):
+        with mock.patch.object(vehbin, "VEH_BINARY", True):
+            vehbin._started = vehbin.to_epoch("2026-10-18 12:00:00")  # started mid-day
+            vehbin.add("2026-10-18 12:00:30", "1604", "00401", "4", "Ečerova")
+            vehbin.flush()
+            self.assertFalse(vehbin.is_complete("2026-10-18"))
+
+            vehbin._started = vehbin.to_epoch("2026-10-18 23:00:00")  # running since before midnight
+            vehbin.add("2026-10-19 00:00:30", "1604", "00401", "4", "Ečerova")
+            vehbin.flush()
+            self.assertTrue(vehbin.is_complete("2026-10-19"))
+            vehbin.add("2026-10-20 00:00:30", "1604", "00401", "4", "Ečerova")
+            vehbin.flush()  # closes 2026-10-19
+
+            vehbin._started = vehbin.to_epoch("2026-10-20 08:00:00")  # after a restart
+            vehbin._complete = None
+            self.assertTrue(vehbin.is_complete("2026-10-19"))
+            self.assertFalse(vehbin.is_complete("2026-10-18"))
+            self.assertFalse(vehbin.is_complete("2026-10-20"))
+
+
+if __name__ == "__main__":
+    unittest.main()
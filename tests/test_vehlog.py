@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+import vehlog
+
+DAYS = ["2026-10-15", "2026-10-16", "2026-10-18"]
+
+
+class IterDayTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        vehlog._offsets.clear()
+        self.path = "1604.txt"
+        self.lines = {
+            day: [f"{day} {h:02d}:00:00 - ID 0040{h % 3} - Vonal 4 - Cél ő{h}" for h in range(5, 5 + n)]
+            for day, n in zip(DAYS, (1, 7, 3))
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            for day in DAYS:
+                f.write("".join(line + "\n" for line in self.lines[day]))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_every_day_is_found(self):
+        for day in DAYS:
+            self.assertEqual(list(vehlog.iter_day(self.path, day)), self.lines[day])
+            self.assertEqual(list(vehlog.iter_day(self.path, day)), vehlog.read_day(self.path, day))
+
+    def test_missing_days_are_empty(self):
+        for day in ("2026-10-01", "2026-10-17", "2026-10-30"):
+            self.assertEqual(list(vehlog.iter_day(self.path, day)), [])
+
+    def test_partial_last_line_is_skipped(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("2026-10-18 09:00:00 - ID 004")
+        self.assertEqual(list(vehlog.iter_day(self.path, "2026-10-18")), self.lines["2026-10-18"])
+
+    def test_single_line_and_empty_files(self):
+        with open("one.txt", "w", encoding="utf-8") as f:
+            f.write(self.lines["2026-10-15"][0] + "\n")
+        self.assertEqual(list(vehlog.iter_day("one.txt", "2026-10-15")), self.lines["2026-10-15"])
+        self.assertEqual(list(vehlog.iter_day("one.txt", "2026-10-16")), [])
+        open("empty.txt", "w").close()
+        self.assertEqual(list(vehlog.iter_day("empty.txt", "2026-10-15")), [])
+
+    def test_drop_days(self):
+        vehlog.drop_days(self.path, ["2026-10-15", "2026-10-16"])
+        self.assertEqual(vehlog.read_day(self.path, "2026-10-16"), [])
+        self.assertEqual(list(vehlog.iter_day(self.path, "2026-10-18")), self.lines["2026-10-18"])
+        vehlog.drop_days(self.path, ["2026-10-18"])
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,14 +5,18 @@ Suitable for 24/7 operation on Railway platform
 """
 
 import asyncio
-import aiohttp
-import json
 import os
+import signal
+import time
 from datetime import datetime
 from pathlib import Path
 import sys
 import logging
 
+import checkpoint
+import feed
+import logwriter
+
 # =======================
 # CONFIGURATION
 # =======================
@@ -82,9 +86,8 @@ def log_trip_event(vehicle_id, course_id, event_type, line_name, timestamp, dest
         
         log_entry = f"{time_str} | {event_type:5} | Jármű: {vehicle_id} | Vonal: {line_name}{destination_str}\n"
         
-        # Append to log file
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        # Queue for the buffered writer (flushed once per poll in main_loop)
+        logwriter.write(log_file, log_entry)
         
         logger.debug(f"Logged {event_type} for vehicle {vehicle_id} on course {course_id}")
         
@@ -163,19 +166,14 @@ async def git_sync_logs():
 async def fetch_vehicle_data():
     """Fetch vehicle data from API"""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(API_URL, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    # Read raw text to handle UTF-8 BOM
-                    text = await response.text()
-                    # Strip BOM if present
-                    if text.startswith('\ufeff'):
-                        text = text[1:]
-                    # Parse JSON
-                    return json.loads(text)
-                else:
-                    logger.warning(f"API returned status code {response.status}")
-                    return None
+        # Shared keep-alive session; a 304 returns the previously decoded document
+        data, changed = await feed.fetch(API_URL)
+        if not changed:
+            logger.debug("Feed not modified since last fetch")
+        return data
+    except feed.FeedError as e:
+        logger.warning(f"API returned status code {e}")
+        return None
     except asyncio.TimeoutError:
         logger.warning("API request timeout")
         return None
@@ -265,9 +263,45 @@ async def process_vehicles(current_vehicles):
         del active_vehicles[vehicle_id]
         del trip_history[vehicle_id]
 
+# =======================
+# CHECKPOINT
+# =======================
+
+def save_checkpoint():
+    """Write the tracker state so a restart resumes the open trips instead of re-logging START"""
+    state = {
+        "active_vehicles": active_vehicles,
+        "trip_history": {
+            vehicle_id: dict(trip, start_time=trip["start_time"].isoformat())
+            for vehicle_id, trip in trip_history.items()
+        }
+    }
+    try:
+        checkpoint.save("trip_logger", state)
+    except (OSError, TypeError, ValueError) as e:
+        logger.error(f"Error saving checkpoint: {e}")
+
+def restore_checkpoint():
+    """Load the tracker state saved before a restart, unless it is older than CHECKPOINT_MAX_AGE"""
+    state, age = checkpoint.load("trip_logger")
+    if state is None:
+        if age is not None:
+            logger.warning(f"Checkpoint is {int(age)} seconds old, starting clean")
+        return
+    active_vehicles.update(state.get("active_vehicles", {}))
+    for vehicle_id, trip in state.get("trip_history", {}).items():
+        trip_history[vehicle_id] = dict(trip, start_time=datetime.fromisoformat(trip["start_time"]))
+    logger.warning(f"Restored {len(active_vehicles)} active vehicles from a {int(age)} second old checkpoint")
+
 async def main_loop():
     """Main application loop"""
     ensure_directories()
+    restore_checkpoint()
+    try:
+        # SIGTERM (e.g. a Railway redeploy) cancels the loop, so the finally block still flushes and checkpoints
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
     logger.warning("Trip Logger started")
     logger.debug(f"API URL: {API_URL}")
     logger.debug(f"Fetch interval: {FETCH_INTERVAL} seconds")
@@ -275,41 +309,54 @@ async def main_loop():
     
     error_count = 0
     max_errors = 10
+    last_checkpoint = 0.0
     
-    while True:
-        try:
-            # Fetch data from API
-            api_data = await fetch_vehicle_data()
+    try:
+        while True:
+            try:
+                # Fetch data from API
+                api_data = await fetch_vehicle_data()
             
-            if api_data:
-                error_count = 0  # Reset error counter on success
+                if api_data:
+                    error_count = 0  # Reset error counter on success
                 
-                # Parse vehicle data
-                current_vehicles = parse_vehicle_data(api_data)
-                logger.debug(f"Fetched data for {len(current_vehicles)} vehicles")
+                    # Parse vehicle data
+                    current_vehicles = parse_vehicle_data(api_data)
+                    logger.debug(f"Fetched data for {len(current_vehicles)} vehicles")
                 
-                # Process vehicles and track trips
-                await process_vehicles(current_vehicles)
+                    # Process vehicles and track trips
+                    await process_vehicles(current_vehicles)
+                    logwriter.flush()
+                    if time.monotonic() - last_checkpoint >= checkpoint.CHECKPOINT_INTERVAL:
+                        # after the flush: the saved state never runs ahead of the logs on disk
+                        save_checkpoint()
+                        last_checkpoint = time.monotonic()
                 
-                # Log current state
-                if current_vehicles:
-                    logger.debug(f"Active vehicles: {list(current_vehicles.keys())}")
+                    # Log current state
+                    if current_vehicles:
+                        logger.debug(f"Active vehicles: {list(current_vehicles.keys())}")
             
-            else:
-                error_count += 1
-                if error_count >= max_errors:
-                    logger.error(f"Maximum API errors ({max_errors}) reached, restarting...")
-                    error_count = 0
+                else:
+                    error_count += 1
+                    if error_count >= max_errors:
+                        logger.error(f"Maximum API errors ({max_errors}) reached, restarting...")
+                        error_count = 0
             
-            # Wait before next fetch
-            await asyncio.sleep(FETCH_INTERVAL)
+                # Wait before next fetch
+                await asyncio.sleep(FETCH_INTERVAL)
         
-        except KeyboardInterrupt:
-            logger.warning("Trip Logger stopped by user")
-            break
-        except Exception as e:
-            logger.error(f"Unexpected error in main loop: {e}")
-            await asyncio.sleep(FETCH_INTERVAL)
+            except KeyboardInterrupt:
+                logger.warning("Trip Logger stopped by user")
+                break
+            except Exception as e:
+                logger.error(f"Unexpected error in main loop: {e}")
+                await asyncio.sleep(FETCH_INTERVAL)
+    except asyncio.CancelledError:
+        logger.warning("Trip Logger stopped by SIGTERM")
+    finally:
+        logwriter.close_all()
+        save_checkpoint()
+        await feed.close_session()
 
 # =======================
 # ENTRY POINT
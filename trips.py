@@ -0,0 +1,45 @@
+"""
+Trip reconstruction
+Turns the chronological sightings of a vehicle (the logs/veh lines: one per course change and
+at most every LOG_INTERVAL seconds) into trips. A trip ends when the course changes or the
+vehicle was not seen for more than MAX_GAP seconds. Works as a generator over any stream of
+sightings, so memory use does not depend on how much history is read.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+# =======================
+# CONFIGURATION
+# =======================
+MAX_GAP = 900  # seconds without a sighting after which a trip counts as finished
+
+# start / end: "YYYY-MM-DD HH:MM:SS" of the first and last sighting, duration: seconds
+Trip = namedtuple("Trip", ["vehicle", "course", "line", "dest", "start", "end", "duration"])
+
+
+def _parse(ts):
+    return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
+
+
+def reconstruct(vehicle, sightings, max_gap=MAX_GAP):
+    """
+    Group a vehicle's sightings into trips
+
+    Args:
+        sightings: iterable of (ts, line, course, dest) in time order
+    Yields:
+        Trip, in time order; dest is the last destination shown on the trip
+    """
+    course = line = dest = start = end = None
+    start_dt = end_dt = None
+    for ts, s_line, s_course, s_dest in sightings:
+        dt = _parse(ts)
+        if course is not None and (s_course != course or (dt - end_dt).total_seconds() > max_gap):
+            yield Trip(vehicle, course, line, dest, start, end, int((end_dt - start_dt).total_seconds()))
+            course = None
+        if course is None:
+            course, line, start, start_dt = s_course, s_line, ts, dt
+        dest, end, end_dt = s_dest, ts, dt
+    if course is not None:
+        yield Trip(vehicle, course, line, dest, start, end, int((end_dt - start_dt).total_seconds()))
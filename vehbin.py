@@ -0,0 +1,301 @@
+"""
+Binary vehicle sighting log (optional)
+Enabled by VEH_BINARY=1. Next to the text lines of logs/veh/<reg>.txt every sighting is then
+also appended to logs/bin/<day>.bin as a fixed-width record of five little-endian uint32:
+    epoch    the local timestamp as seconds (calendar.timegm of the naive local time)
+    vehicle  fleet number
+    course   \\
+    line      > ids into the day's string table, logs/bin/<day>.json
+    dest     /
+A day file is mapped with mmap and viewed as a flat uint32 array, so a day query is a
+stride-5 walk over memory instead of splitting text lines.
+
+A day file only answers queries if it holds the whole day (is_complete): days converted by
+to-bin, and days this process has been writing since midnight. Closed days of the latter kind are
+recorded in logs/bin/complete.json. A day the binary log joined mid-way (VEH_BINARY turned on, a
+restart) is read from the text logs instead.
+
+Convert between the formats (run it while the bot is stopped; after turning VEH_BINARY on,
+run to-bin once so the days logged before are complete in the binary format too):
+    python vehbin.py to-bin [logs_dir]            text logs/veh/*.txt -> logs/bin/<day>.bin
+    python vehbin.py to-text <day> [out_dir]      logs/bin/<day>.bin -> out_dir/<reg>.txt
+"""
+
+import array
+import calendar
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+# =======================
+# CONFIGURATION
+# =======================
+VEH_BINARY = os.getenv("VEH_BINARY", "") not in ("", "0")
+BIN_DIR = "logs/bin"
+COMPLETE_FILE = "logs/bin/complete.json"  # closed days whose .bin file is whole
+RECORD = struct.Struct("<5I")  # epoch, vehicle, course, line, dest
+FIELDS = 5
+
+# =======================
+# STATE
+# =======================
+_tables = {}  # day -> {"strings": [...], "ids": {string: id}, "saved": number of strings on disk}
+_pending = deque()  # (ts, vehicle, course, line, dest) waiting for flush(), which interns and packs them
+_complete = None  # set of days in COMPLETE_FILE, loaded on first use
+_lock = threading.Lock()
+
+
+def enabled():
+    return VEH_BINARY
+
+
+def bin_path(day):
+    return os.path.join(BIN_DIR, f"{day}.bin")
+
+
+def table_path(day):
+    return os.path.join(BIN_DIR, f"{day}.json")
+
+
+def to_epoch(ts):
+    """'YYYY-MM-DD HH:MM:SS' (naive local time) -> seconds"""
+    return calendar.timegm(time.strptime(ts, "%Y-%m-%d %H:%M:%S"))
+
+
+def from_epoch(epoch):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch))
+
+
+# start of this process on the records' time scale: days starting later are logged whole
+_started = to_epoch(time.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def _covered(day):
+    return _started <= to_epoch(f"{day} 00:00:00")
+
+
+def _table(day):
+    table = _tables.get(day)
+    if table is None:
+        try:
+            with open(table_path(day), "r", encoding="utf-8") as f:
+                strings = json.load(f)
+        except (OSError, ValueError):
+            strings = []
+        table = _tables[day] = {
+            "strings": strings,
+            "ids": {s: i for i, s in enumerate(strings)},
+            "saved": len(strings)
+        }
+    return table
+
+
+def _intern(table, text):
+    text = str(text)
+    sid = table["ids"].get(text)
+    if sid is None:
+        sid = table["ids"][text] = len(table["strings"])
+        table["strings"].append(text)
+    return sid
+
+
+def _save_table(day, table):
+    os.makedirs(BIN_DIR, exist_ok=True)
+    tmp = table_path(day) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table["strings"], f, ensure_ascii=False)
+    os.replace(tmp, table_path(day))
+    table["saved"] = len(table["strings"])
+
+
+def _complete_days():
+    global _complete
+    if _complete is None:
+        try:
+            with open(COMPLETE_FILE, "r", encoding="utf-8") as f:
+                _complete = set(json.load(f))
+        except (OSError, ValueError):
+            _complete = set()
+    return _complete
+
+
+def _mark_complete(days):
+    complete = _complete_days()
+    if not set(days) - complete:
+        return
+    complete.update(days)
+    os.makedirs(BIN_DIR, exist_ok=True)
+    tmp = COMPLETE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(sorted(complete), f)
+    os.replace(tmp, COMPLETE_FILE)
+
+
+def add(ts, vehicle, course, line, dest):
+    """
+    Queue one sighting (same fields as a logs/veh line); non-numeric vehicles are skipped
+    Only appends to memory: string tables are read and extended by flush(), on the I/O thread.
+    """
+    vehicle = str(vehicle)
+    if vehicle.isdecimal():
+        _pending.append((ts, vehicle, course, line, dest))
+
+
+def flush():
+    """Append the queued records; a day's string table is saved before records that use it"""
+    with _lock:
+        if not _pending:
+            return 0
+        groups = {}
+        count = 0
+        while _pending:  # add() may append meanwhile: deque appends and pops are thread-safe
+            ts, vehicle, course, line, dest = _pending.popleft()
+            day = ts[:10]
+            table = _table(day)
+            groups.setdefault(day, []).append(RECORD.pack(
+                to_epoch(ts), int(vehicle), _intern(table, course), _intern(table, line), _intern(table, dest)
+            ))
+            count += 1
+        for day, records in groups.items():
+            table = _table(day)
+            if table["saved"] != len(table["strings"]):
+                _save_table(day, table)
+            with open(bin_path(day), "ab") as f:
+                f.write(b"".join(records))
+        # earlier days are closed; keep only the tables still being written, and remember the
+        # closed days this process wrote from their first minute
+        closed = [d for d in _tables if d < max(groups)]
+        _mark_complete([d for d in closed if _covered(d)])
+        for day in closed:
+            del _tables[day]
+        return count
+
+
+def has_day(day):
+    return os.path.exists(bin_path(day))
+
+
+def is_complete(day):
+    """Whether logs/bin/<day>.bin holds every sighting of the day (only then may it replace the text logs)"""
+    if not has_day(day):
+        return False
+    with _lock:
+        return day in _complete_days() or (VEH_BINARY and _covered(day))
+
+
+def read_day(day, accept):
+    """
+    Sightings of one day whose vehicle passes accept(reg)
+
+    Returns:
+        dict: {reg: [(ts, line, course, dest), ...]} in logging order
+    """
+    found = {}
+    with open(bin_path(day), "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        usable = size - size % RECORD.size  # a half-written record is ignored
+        if usable == 0:
+            return found
+        # the table is read after sizing the data: it is always saved before the records using it
+        with open(table_path(day), "r", encoding="utf-8") as t:
+            strings = json.load(t)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if sys.byteorder == "little":
+                view = memoryview(mm)[:usable].cast("I")
+            else:
+                view = memoryview(array.array("I", [x for r in RECORD.iter_unpack(mm[:usable]) for x in r]))
+            try:
+                wanted = {}  # vehicle number -> accepted?
+                for i in range(0, len(view), FIELDS):
+                    vehicle = view[i + 1]
+                    ok = wanted.get(vehicle)
+                    if ok is None:
+                        ok = wanted[vehicle] = accept(str(vehicle))
+                    if ok:
+                        found.setdefault(str(vehicle), []).append((
+                            from_epoch(view[i]), strings[view[i + 3]], strings[view[i + 2]], strings[view[i + 4]]
+                        ))
+            finally:
+                view.release()
+    return found
+
+
+# =======================
+# CONVERTER
+# =======================
+
+def _parse_line(text):
+    # "YYYY-MM-DD HH:MM:SS - ID 01203 - Vonal 4 - Destination"
+    parts = text.split(" - ", 3)
+    if len(parts) < 4 or not parts[1].startswith("ID ") or not parts[2].startswith("Vonal "):
+        return None
+    return parts[0], parts[1][3:], parts[2][6:], parts[3]
+
+
+def text_to_bin(logs_dir="logs"):
+    """Rebuild logs/bin/<day>.bin for every day found in the text vehicle logs; returns {day: records}"""
+    veh_dir = os.path.join(logs_dir, "veh")
+    days = {}
+    for fname in sorted(os.listdir(veh_dir)):
+        vehicle = fname[:-4]
+        if not fname.endswith(".txt") or not vehicle.isdecimal():
+            continue
+        with open(os.path.join(veh_dir, fname), "r", encoding="utf-8") as f:
+            for text in f:
+                parsed = _parse_line(text.rstrip("\n"))
+                if parsed:
+                    ts, course, line, dest = parsed
+                    days.setdefault(ts[:10], []).append((to_epoch(ts), int(vehicle), course, line, dest))
+
+    os.makedirs(BIN_DIR, exist_ok=True)
+    counts = {}
+    for day, rows in sorted(days.items()):
+        rows.sort(key=lambda r: r[0])  # stable: a vehicle's lines keep their order
+        table = {"strings": [], "ids": {}, "saved": 0}
+        data = b"".join(
+            RECORD.pack(epoch, vehicle, _intern(table, course), _intern(table, line), _intern(table, dest))
+            for epoch, vehicle, course, line, dest in rows
+        )
+        _save_table(day, table)
+        tmp = bin_path(day) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, bin_path(day))
+        _tables.pop(day, None)
+        counts[day] = len(rows)
+    # today stays out: it only counts as whole while one process writes it from midnight on
+    today = time.strftime("%Y-%m-%d")
+    with _lock:
+        _mark_complete([day for day in counts if day < today])
+    return counts
+
+
+def bin_to_text(day, out_dir):
+    """Write a day's records back as text vehicle logs (out_dir/<reg>.txt, appended); returns the record count"""
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for reg, records in sorted(read_day(day, lambda reg: True).items()):
+        with open(os.path.join(out_dir, f"{reg}.txt"), "a", encoding="utf-8") as f:
+            for ts, line, course, dest in records:
+                f.write(f"{ts} - ID {course} - Vonal {line} - {dest}\n")
+        count += len(records)
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "to-bin":
+        logs_dir = sys.argv[2] if len(sys.argv) > 2 else "logs"
+        counts = text_to_bin(logs_dir)
+        print(f"Converted {sum(counts.values())} sightings of {len(counts)} days into {BIN_DIR}/")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "to-text":
+        out_dir = sys.argv[3] if len(sys.argv) > 3 else "logs/veh-from-bin"
+        n = bin_to_text(sys.argv[2], out_dir)
+        print(f"Wrote {n} sightings of {sys.argv[2]} into {out_dir}/")
+    else:
+        print("Usage: python vehbin.py to-bin [logs_dir] | python vehbin.py to-text <YYYY-MM-DD> [out_dir]")
+        sys.exit(1)
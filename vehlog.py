@@ -0,0 +1,179 @@
+"""
+Vehicle log reader
+logs/veh/<reg>.txt holds a vehicle's whole history, one chronological line per sighting:
+    "YYYY-MM-DD HH:MM:SS - ID 01203 - Vonal 4 - Destination"
+Two ways to reach one day without scanning the whole history:
+    iter_day    memory-maps the log and binary-searches the leading timestamps (the file is
+                chronological), then streams that day's lines; nothing to maintain
+    day_offsets a day -> byte range sidecar (logs/index/veh/<reg>.json), extended incrementally
+                as the log grows; exact even if lines are out of order (used by the archiver)
+"""
+
+import json
+import mmap
+import os
+import threading
+from contextlib import nullcontext
+
+# =======================
+# CONFIGURATION
+# =======================
+VEH_DIR = "logs/veh"
+OFFSET_DIR = "logs/index/veh"
+
+# =======================
+# STATE
+# =======================
+# {log path: {"size": bytes indexed, "days": {"YYYY-MM-DD": [start, end]}}}
+_offsets = {}
+_lock = threading.RLock()  # queries run on several I/O threads
+
+
+def _sidecar_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(OFFSET_DIR, f"{name}.json")
+
+
+def _load_sidecar(path):
+    try:
+        with open(_sidecar_path(path), "r", encoding="utf-8") as f:
+            idx = json.load(f)
+        if isinstance(idx.get("size"), int) and isinstance(idx.get("days"), dict):
+            return idx
+    except (OSError, ValueError):
+        pass
+    return {"size": 0, "days": {}}
+
+
+def _save_sidecar(path, idx):
+    sidecar = _sidecar_path(path)
+    os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+    tmp = sidecar + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(idx, f)
+    os.replace(tmp, sidecar)
+
+
+def day_offsets(path):
+    """
+    Return the day -> [start, end] byte ranges of a vehicle log, indexing any new tail first
+    Only complete lines are indexed; a shrunk file (rewritten log) is re-indexed from scratch.
+    """
+    with _lock:
+        idx = _offsets.get(path)
+        if idx is None:
+            idx = _offsets[path] = _load_sidecar(path)
+
+        size = os.path.getsize(path)
+        if size < idx["size"]:
+            idx = _offsets[path] = {"size": 0, "days": {}}
+        if size == idx["size"]:
+            return idx["days"]
+
+        pos = idx["size"]
+        days = idx["days"]
+        with open(path, "rb") as f:
+            f.seek(pos)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # half-written line, index it next time
+                end = pos + len(raw)
+                day = raw[:10].decode("ascii", errors="replace")
+                rng = days.get(day)
+                if rng is None:
+                    days[day] = [pos, end]
+                else:
+                    rng[1] = end
+                pos = end
+
+        if pos != idx["size"]:
+            idx["size"] = pos
+            _save_sidecar(path, idx)
+        return days
+
+
+def read_day(path, day):
+    """Lines of one day from a vehicle log (only that day's byte range is read)"""
+    with _lock:  # drop_days may rewrite the file; offsets and content must match
+        rng = day_offsets(path).get(day)
+        if rng is None:
+            return []
+        start, end = rng
+        with open(path, "rb") as f:
+            f.seek(start)
+            chunk = f.read(end - start)
+    return [
+        line for line in chunk.decode("utf-8", errors="replace").splitlines()
+        if line.startswith(day)
+    ]
+
+
+def drop_days(path, days, guard=nullcontext):
+    """
+    Remove the lines of the given days from a vehicle log (once they are archived) and reset its
+    offset index; a log left empty is deleted. The log is filtered into a temporary file first;
+    only the final step - catching up with lines appended meanwhile and swapping the files - runs
+    inside guard(), the context that keeps the log writer off the file.
+    """
+    prefixes = tuple(day.encode("ascii") for day in days)
+    tmp = path + ".tmp"
+    with open(path, "rb") as f, open(tmp, "wb") as out:
+        for raw in f:
+            if not raw.startswith(prefixes):
+                out.write(raw)
+        seen = f.tell()
+    with guard(), _lock:
+        with open(path, "rb") as f, open(tmp, "ab") as out:
+            f.seek(seen)
+            for raw in f:
+                if not raw.startswith(prefixes):
+                    out.write(raw)
+            kept = out.tell()
+        if kept:
+            os.replace(tmp, path)
+        else:
+            os.remove(tmp)
+            os.remove(path)
+        _offsets.pop(path, None)
+        try:
+            os.remove(_sidecar_path(path))
+        except FileNotFoundError:
+            pass
+
+
+def _line_at(mm, pos):
+    """Start of the first line that begins at or after pos"""
+    if pos == 0:
+        return 0
+    nl = mm.find(b"\n", pos - 1)
+    return len(mm) if nl == -1 else nl + 1
+
+
+def iter_day(path, day):
+    """
+    Stream the lines of one day from a vehicle log
+    The log is memory-mapped and the first line of the day found by binary search on the
+    leading "YYYY-MM-DD" of the lines; only lines of that day are decoded. The mapping keeps
+    its snapshot even if the log is rewritten meanwhile.
+    """
+    key = day.encode("ascii")
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            lo, hi = 0, size
+            while lo < hi:  # smallest pos whose next line is the day or later
+                mid = (lo + hi) // 2
+                start = _line_at(mm, mid)
+                if start < size and mm[start:start + 10] < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            pos = _line_at(mm, lo)
+            while pos < size:
+                end = mm.find(b"\n", pos)
+                if end == -1 or mm[pos:pos + 10] != key:
+                    break  # next day, or a half-written last line
+                yield mm[pos:end].decode("utf-8", errors="replace")
+                pos = end + 1